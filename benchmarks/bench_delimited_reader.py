@@ -0,0 +1,58 @@
+"""
+Benchmark for the delimited file readers on long, wide lines.
+
+Parses the same number of bytes with lines of increasing width using the lookahead regex split
+the readers replaced and each reader in `delimited_readers`. Time per MB should stay flat as lines
+get wider for a linear parser and grow with the line width for the regex split.
+
+Usage: python benchmarks/bench_delimited_reader.py [--mbytes 4] [--widths 20,100,500,2000]
+"""
+import argparse
+import io
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+try:
+    import cx_Oracle
+except ImportError:
+    import fake_cx_oracle
+    fake_cx_oracle.install()
+from import_oracle import ImportData
+
+MAX_BYTES_PER_CHUNK = 1024 * 1024
+
+
+def read_regex_batches(f, delimiter, max_bytes_per_chunk):
+    regex_pattern = re.compile(r'''%s(?=(?:[^"]*"[^"]*")*[^"]*$)''' % re.escape(delimiter))
+    while True:
+        lines = f.readlines(max_bytes_per_chunk)
+        if not lines:
+            break
+        yield [regex_pattern.split(line.strip()) for line in lines]
+
+
+def make_file(width, mbytes):
+    line = '~'.join(['"quoted ~ %d"' % i if i % 10 == 0 else 'value%d' % i for i in range(width)]) + '\n'
+    return line * max(1, (mbytes * 1024 * 1024) // len(line))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mbytes', type=int, default=4)
+    parser.add_argument('--widths', default='20,100,500,2000')
+    args = parser.parse_args()
+
+    readers = dict(ImportData.delimited_readers, regex=read_regex_batches)
+    print('%-8s %s' % ('columns', ''.join(['%14s' % ('%s s/MB' % name) for name in readers])))
+    for width in [int(w) for w in args.widths.split(',')]:
+        data = make_file(width, args.mbytes)
+        timings = []
+        for name, reader in readers.items():
+            start = time.perf_counter()
+            for batch in reader(io.StringIO(data, newline=''), '~', MAX_BYTES_PER_CHUNK):
+                pass
+            timings.append((time.perf_counter() - start) / args.mbytes)
+        print('%-8d %s' % (width, ''.join(['%14.3f' % t for t in timings])))
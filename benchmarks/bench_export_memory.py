@@ -0,0 +1,96 @@
+"""
+Peak memory benchmark for `process_export`.
+
+Each result size is exported in a fresh child process from a synthetic cursor, so the reported peak RSS
+only covers that export. Peak RSS should stay roughly flat as the number of rows grows.
+
+Usage: python benchmarks/bench_export_memory.py [--rows 50000,200000,800000] [--arraysize 1000]
+"""
+import argparse
+import datetime
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+try:
+    import cx_Oracle
+except ImportError:
+    # The export reads from a synthetic connection, the stand-in driver only has to satisfy the import.
+    import fake_cx_oracle
+    fake_cx_oracle.install()
+from import_oracle import ImportData
+
+COLUMNS = ['CIN', 'AID_CODE', 'PROGRAM', 'LAST_NAME', 'FIRST_NAME', 'ELIGIBILITY_DATE', 'STATUS', 'COUNTY']
+
+
+class SyntheticCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.arraysize = 100
+        self.description = None
+
+    def execute(self, query):
+        cx_Oracle = ImportData.cx_Oracle
+        self.description = [(c, cx_Oracle.DATETIME if c == 'ELIGIBILITY_DATE' else cx_Oracle.STRING) for c in COLUMNS]
+        load_date = datetime.datetime(2019, 12, 31)
+        self.results = (
+            ['1B%05d' % i, 'MC', 'Medi-Cal', 'Lastname%d' % i, 'Firstname%d' % i, load_date, 'Y', 'C%02d' % (i % 60)]
+            for i in range(self.rows)
+        )
+
+    def fetchmany(self, size=None):
+        return [row for _, row in zip(range(size or self.arraysize), self.results)]
+
+    def fetchall(self):
+        return list(self.results)
+
+
+class SyntheticConnection:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self):
+        return SyntheticCursor(self.rows)
+
+
+def run_child(rows, arraysize):
+    output_dir = tempfile.mkdtemp()
+    descriptor_file = os.path.join(output_dir, 'export.json')
+    with open(descriptor_file, 'w') as fp:
+        json.dump({
+            'SourceInfo': {'DBServer': 'synthetic', 'DBPort': '1521', 'Schema': 'BENCH', 'DBService': 'ORCL',
+                           'UserName': 'bench', 'PassWord': 'bench', 'SQL': 'SELECT * FROM ELIGIBILITY',
+                           'ArraySize': arraysize},
+            'TargetInfo': {'Location': output_dir, 'FileName': 'export.xlsx'},
+            'ColMappings': []
+        }, fp)
+    ImportData.logs.setLevel('WARN')
+    ImportData.create_db_connection = lambda *a: SyntheticConnection(rows)
+    start = time.perf_counter()
+    ImportData.process_export(descriptor_file)
+    elapsed = time.perf_counter() - start
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    print(json.dumps({'rows': rows, 'seconds': elapsed, 'peak_rss_mb': peak_rss_mb}))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', default='50000,200000,800000')
+    parser.add_argument('--arraysize', type=int, default=1000)
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        run_child(args.child, args.arraysize)
+        sys.exit(0)
+
+    print('%10s %10s %12s %14s' % ('rows', 'seconds', 'rows/sec', 'peak RSS MB'))
+    for rows in [int(r) for r in args.rows.split(',')]:
+        output = subprocess.check_output([sys.executable, __file__, '--child', str(rows), '--arraysize', str(args.arraysize)])
+        result = json.loads(output.decode().strip().splitlines()[-1])
+        print('%10d %10.2f %12.0f %14.1f' % (rows, result['seconds'], rows / result['seconds'], result['peak_rss_mb']))
@@ -0,0 +1,80 @@
+"""
+Micro-benchmark for the ColMappings row transformer on a wide descriptor.
+
+Compares the per-cell interpretation of the mapping `Type` strings (the way rows were mapped
+before `compile_row_mapper`) with the compiled per-file row function.
+
+Usage: python benchmarks/bench_row_mapper.py [--columns 60] [--rows 200000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+try:
+    import cx_Oracle
+except ImportError:
+    import fake_cx_oracle
+    fake_cx_oracle.install()
+from import_oracle import ImportData
+
+
+def interpreted_map_row(row, mapping_list, row_num=None, source_filename=None, header=True, header_values=None):
+    row += [''] * (len(header_values) - len(row))
+    bind_values = []
+    for i, elem in mapping_list:
+        e = elem.get('Type')
+        if e.startswith('S-FILENAME'):
+            _, start, end = tuple(e.split('.'))
+            cell_value = os.path.basename(source_filename)[int(start)-1:int(end)]
+        elif e == 'S-ROWNUM':
+            cell_value = row_num
+        else:
+            if header:
+                source_column = int(header_values.index(elem['Source']))
+            else:
+                source_column = i
+            cell_value = str(row[source_column])
+        bind_values.append(cell_value)
+    return tuple(bind_values)
+
+
+def wide_descriptor(columns):
+    col_mappings = [{'Order': str(i + 1), 'Source': 'COL_%d' % i, 'Target': 'COL_%d' % i, 'Type': 'S'} for i in range(columns)]
+    col_mappings += [
+        {'Order': str(columns + 1), 'Target': 'COUNTY', 'Type': 'S-FILENAME.1.3'},
+        {'Order': str(columns + 2), 'Target': 'ROW_NUM', 'Type': 'S-ROWNUM'},
+        {'Order': str(columns + 3), 'Target': 'LOAD_DATE', 'Type': 'S-datetime.now()'},
+        {'Order': str(columns + 4), 'Target': 'SOURCE', 'Type': 'C-NIGHTLY'},
+    ]
+    # Shuffle the source order so header lookups are not all at the front of the list.
+    header_values = ['COL_%d' % i for i in reversed(range(columns))]
+    return col_mappings, header_values
+
+
+def run(label, map_row, rows):
+    start = time.perf_counter()
+    for row_num, row in enumerate(rows, 1):
+        map_row(list(row), row_num)
+    elapsed = time.perf_counter() - start
+    print('%-12s %10.0f rows/sec (%.2fs)' % (label, len(rows) / elapsed, elapsed))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--columns', type=int, default=60)
+    parser.add_argument('--rows', type=int, default=200000)
+    args = parser.parse_args()
+
+    col_mappings, header_values = wide_descriptor(args.columns)
+    _, bind_mappings = ImportData.build_insert_sql('BENCH', col_mappings)
+    rows = [['%d-%d' % (r, c) for c in range(args.columns)] for r in range(args.rows)]
+    source_filename = 'SCL_eligibility.txt'
+
+    compiled = ImportData.compile_row_mapper(bind_mappings, source_filename=source_filename, header_values=header_values)
+    assert compiled(list(rows[0]), 1) == interpreted_map_row(list(rows[0]), bind_mappings, 1, source_filename, True, header_values)
+
+    print('%d columns, %d rows' % (len(col_mappings), args.rows))
+    run('interpreted', lambda row, row_num: interpreted_map_row(row, bind_mappings, row_num, source_filename, True, header_values), rows)
+    run('compiled', compiled, rows)
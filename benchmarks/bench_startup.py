@@ -0,0 +1,102 @@
+"""
+Benchmark for the startup cost of `ImportData.py`: the wall time of a fresh interpreter running each scenario.
+
+cx_Oracle, openpyxl and xlsxwriter are imported only on the code paths that need them. The `eager` scenario
+imports all three up front as the module used to, next to a plain import of the module, `--help` and a
+small delimited import. When cx_Oracle is not installed the `fake_cx_oracle` stand-in is registered instead,
+so its import time is not measured.
+
+Scenarios:
+    help        python ImportData.py --help
+    library     from import_oracle import ImportData
+    eager       the library import after importing cx_Oracle, openpyxl and xlsxwriter
+    csv_import  configure and process_import of a 100 row `~` delimited file
+
+Usage: python benchmarks/bench_startup.py [--repeat 10] [--scenarios help,library,eager,csv_import]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+PACKAGE_DIR = os.path.join(BENCHMARKS_DIR, '..')
+SCENARIOS = ['help', 'library', 'eager', 'csv_import']
+HEAVY_MODULES = ['cx_Oracle', 'openpyxl', 'xlsxwriter']
+
+CHILD_SETUP = '''
+import importlib.util, sys
+sys.path[:0] = [%r, %r]
+if importlib.util.find_spec('cx_Oracle') is None:
+    import fake_cx_oracle
+    fake_cx_oracle.install()
+''' % (BENCHMARKS_DIR, PACKAGE_DIR)
+
+CHILD_REPORT = '''
+import json
+loaded = [m for m in %r if m in sys.modules and not hasattr(sys.modules[m], 'install')]
+print(json.dumps(loaded))
+''' % HEAVY_MODULES
+
+CHILD_CODE = {
+    'library': 'from import_oracle import ImportData\n',
+    'eager': 'import cx_Oracle, openpyxl, xlsxwriter\nfrom openpyxl.worksheet._reader import WorkSheetParser\n'
+             'from xlsxwriter.utility import xl_rowcol_to_cell\nfrom import_oracle import ImportData\n',
+    'csv_import': 'from import_oracle import ImportData\nImportData.configure([sys.argv[1]])\n'
+                  'ImportData.logs.setLevel("WARN")\nImportData.process_import(sys.argv[1])\n'
+}
+
+
+def write_descriptor(work_dir):
+    import generate_data
+    source_file = os.path.join(work_dir, 'SCL_input.txt')
+    generate_data.write_delimited(source_file, 100)
+    with open(os.path.join(BENCHMARKS_DIR, 'descriptors', 'import.json'), 'r') as fp:
+        descriptor = json.load(fp)
+    descriptor['SourceInfo']['Location'] = source_file
+    filename = os.path.join(work_dir, 'import.json')
+    with open(filename, 'w') as fp:
+        json.dump(descriptor, fp)
+    return filename
+
+
+def run_scenario(scenario, descriptor_file, work_dir):
+    """
+    Returns the wall time of one child process running `scenario` and the heavy modules it loaded.
+    """
+    if scenario == 'help':
+        command = [sys.executable, os.path.join(PACKAGE_DIR, 'import_oracle', 'ImportData.py'), '--help']
+    else:
+        command = [sys.executable, '-c', CHILD_SETUP + CHILD_CODE[scenario] + CHILD_REPORT, descriptor_file]
+    start = time.perf_counter()
+    output = subprocess.check_output(command, cwd=work_dir)
+    elapsed = time.perf_counter() - start
+    loaded = [] if scenario == 'help' else json.loads(output.decode().strip().splitlines()[-1])
+    return elapsed, loaded
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    args = parser.parse_args()
+
+    sys.path.insert(0, BENCHMARKS_DIR)
+    work_dir = tempfile.mkdtemp()
+    try:
+        descriptor_file = write_descriptor(work_dir)
+        print('%-12s %12s %12s  %s' % ('scenario', 'median ms', 'min ms', 'heavy modules loaded'))
+        for scenario in args.scenarios.split(','):
+            timings = []
+            for _ in range(args.repeat):
+                elapsed, loaded = run_scenario(scenario, descriptor_file, work_dir)
+                timings.append(elapsed)
+            print('%-12s %12.1f %12.1f  %s' % (scenario, statistics.median(timings) * 1000, min(timings) * 1000,
+                                               ', '.join(loaded) or '-'))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
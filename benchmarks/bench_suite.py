@@ -0,0 +1,222 @@
+"""
+Offline benchmark suite for the import and export paths, run against `fake_cx_oracle` instead of a database.
+
+Every scenario runs in a fresh child process over synthetic data from `generate_data.py` and the
+descriptors in `benchmarks/descriptors`, and reports rows/sec, peak RSS and the database round-trips
+and bytes the run would have sent. `--latency` and `--row-latency` add a delay to every round-trip to
+model a remote database.
+
+Scenarios:
+    import          ImportData.process_import of a `~` delimited file
+    import_xlsx     ImportData.process_import of an xlsx file
+    xlsx_rows       ImportData.iter_xlsx_rows alone, the xlsx parsing cost of import_xlsx
+    export          ImportData.process_export into FileNamePrefixColName workbooks
+    export_csv      ImportData.process_export into FileNamePrefixColName csv files
+    export_csv_gz   ImportData.process_export into FileNamePrefixColName gzip compressed csv files
+    import_delta    ImportData.process_import with --delta-dir of a copy of the import file with 3% of its rows
+                    changed, after an untimed first load of the file
+    import_oracle   import-oracle.py import_data of a `~` delimited file
+
+Usage: python benchmarks/bench_suite.py [--rows 100000] [--scenarios import,export] [--latency 0.002]
+                                        [--import-args "--inserters 4 --adaptive-batches"] [--data-dir DIR]
+"""
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import resource
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+PACKAGE_DIR = os.path.join(BENCHMARKS_DIR, '..', 'import_oracle')
+SCENARIOS = ['import', 'import_xlsx', 'xlsx_rows', 'export', 'export_csv', 'export_csv_gz', 'import_delta', 'import_oracle']
+# TargetInfo overrides of the export scenarios.
+EXPORT_TARGETS = {
+    'export': {},
+    'export_csv': {'TargetInfo__Format': 'csv', 'TargetInfo__FileName': 'eligibility.csv'},
+    'export_csv_gz': {'TargetInfo__Format': 'csv', 'TargetInfo__FileName': 'eligibility.csv.gz', 'TargetInfo__Gzip': 'yes'}
+}
+COUNTIES = ['ALA', 'FRE', 'KER', 'LAX', 'ORA', 'RIV', 'SAC', 'SBD', 'SCL', 'SDO']
+
+
+def data_file(data_dir, rows, extension):
+    """
+    Returns the synthetic data file of `rows` rows, generating it on first use.
+    """
+    import generate_data
+    filename = os.path.join(data_dir, 'SCL_input_%d.%s' % (rows, extension))
+    if not os.path.exists(filename):
+        if extension == 'xlsx':
+            generate_data.write_xlsx(filename, rows)
+        else:
+            generate_data.write_delimited(filename, rows)
+    return filename
+
+
+def load_descriptor(name, work_dir, **overrides):
+    """
+    Copy the descriptor `name` into `work_dir` with `overrides` applied to its SourceInfo and TargetInfo.
+    """
+    with open(os.path.join(BENCHMARKS_DIR, 'descriptors', name), 'r') as fp:
+        descriptor = json.load(fp)
+    for key, value in overrides.items():
+        section, field = key.split('__')
+        descriptor.setdefault(section, {})[field] = value
+    filename = os.path.join(work_dir, name)
+    with open(filename, 'w') as fp:
+        json.dump(descriptor, fp)
+    return filename
+
+
+def import_data_module(argv):
+    sys.path.insert(0, os.path.join(BENCHMARKS_DIR, '..'))
+    from import_oracle import ImportData
+    ImportData.configure(argv[1:])
+    ImportData.logs.setLevel('WARN')
+    return ImportData
+
+
+def write_changed_copy(source_file, filename, every=33):
+    """
+    Copy `source_file` to `filename` with the AGE column of one row in `every` changed.
+    """
+    import generate_data
+    age = generate_data.COLUMNS.index('AGE')
+    with open(source_file, 'r') as src, open(filename, 'w') as dst:
+        dst.write(src.readline())
+        for n, line in enumerate(src):
+            if n % every == 0:
+                values = line.split('~')
+                values[age] = str(int(values[age]) + 1)
+                line = '~'.join(values)
+            dst.write(line)
+
+
+def register_export_results(fake, rows):
+    import generate_data
+    columns = generate_data.COLUMNS + ['COUNTY', 'LOAD_DATE']
+    load_date = datetime.datetime(2019, 12, 31)
+
+    def export_rows(binds):
+        per_county = rows // len(COUNTIES)
+        for n, county in enumerate(COUNTIES):
+            count = per_county if n < len(COUNTIES) - 1 else rows - per_county * n
+            for row in generate_data.iter_rows(count, seed=n):
+                yield tuple(row) + (county, load_date)
+
+    fake.add_result('FROM ELIG_STATUS_CODES', [('ELIG_STATUS', fake.STRING)], lambda binds: [('C',), ('O',)])
+    fake.add_result('FROM ELIGIBILITY', [(c, fake.DATETIME if c == 'LOAD_DATE' else fake.STRING) for c in columns], export_rows)
+
+
+def run_child(scenario, rows, data_dir, import_args):
+    import fake_cx_oracle
+    fake = fake_cx_oracle.install()
+    work_dir = tempfile.mkdtemp(dir=data_dir)
+    os.chdir(work_dir)
+    try:
+        if scenario == 'import_oracle':
+            source_file = data_file(data_dir, rows, 'txt')
+            # import-oracle.py imports ImportData from its own directory, like it does when run as a script.
+            sys.path.insert(0, PACKAGE_DIR)
+            spec = importlib.util.spec_from_file_location('import_oracle_script', os.path.join(PACKAGE_DIR, 'import-oracle.py'))
+            script = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(script)
+            script.configure(['--header'] + import_args + ['SCL', 'ELIGIBILITY', source_file])
+            script.log = lambda msg, level='INFO': None
+            script.dsn = 'benchmark'
+            script.connection = fake.connect()
+            fake.reset()
+            start = time.perf_counter()
+            script.import_data()
+        elif scenario in EXPORT_TARGETS:
+            descriptor_file = load_descriptor('export.json', work_dir, TargetInfo__Location=work_dir, **EXPORT_TARGETS[scenario])
+            ImportData = import_data_module(['ImportData.py', descriptor_file] + import_args)
+            register_export_results(fake, rows)
+            fake.reset()
+            start = time.perf_counter()
+            ImportData.process_export(descriptor_file)
+        elif scenario == 'import_delta':
+            source_file = os.path.join(work_dir, 'SCL_input.txt')
+            shutil.copy(data_file(data_dir, rows, 'txt'), source_file)
+            descriptor_file = load_descriptor('import.json', work_dir, SourceInfo__Location=source_file, Incremental__KeyColumns=['CIN'], Incremental__Merge='yes')
+            argv = ['ImportData.py', descriptor_file, '--delta-dir', os.path.join(work_dir, 'delta')] + import_args
+            ImportData = import_data_module(argv)
+            ImportData.process_import(descriptor_file)
+            write_changed_copy(data_file(data_dir, rows, 'txt'), source_file)
+            ImportData.configure(argv[1:])
+            ImportData.logs.setLevel('WARN')
+            fake.reset()
+            start = time.perf_counter()
+            ImportData.log_import_summary(ImportData.process_import(descriptor_file))
+        elif scenario == 'xlsx_rows':
+            source_file = data_file(data_dir, rows, 'xlsx')
+            ImportData = import_data_module(['ImportData.py', 'benchmark'] + import_args)
+            fake.reset()
+            start = time.perf_counter()
+            for row in ImportData.iter_xlsx_rows(source_file):
+                pass
+        else:
+            extension = 'xlsx' if scenario == 'import_xlsx' else 'txt'
+            source_file = data_file(data_dir, rows, extension)
+            descriptor_file = load_descriptor('%s.json' % scenario, work_dir, SourceInfo__Location=source_file)
+            ImportData = import_data_module(['ImportData.py', descriptor_file] + import_args)
+            fake.reset()
+            start = time.perf_counter()
+            ImportData.log_import_summary(ImportData.process_import(descriptor_file))
+        elapsed = time.perf_counter() - start
+    finally:
+        os.chdir(data_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    result = {'scenario': scenario, 'rows': rows, 'seconds': elapsed, 'peak_rss_mb': peak_rss_mb}
+    result.update(fake.stats)
+    print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', default='100000', help='Comma separated row counts, every scenario runs once per count')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every database round-trip')
+    parser.add_argument('--row-latency', dest='row_latency', type=float, default=0.0, help='Seconds added per row sent or fetched')
+    parser.add_argument('--import-args', dest='import_args', default='', help='Extra command line arguments of ImportData.py or import-oracle.py')
+    parser.add_argument('--data-dir', dest='data_dir', help='Directory keeping the generated data between runs. Defaults to a temporary directory')
+    parser.add_argument('--json', help='Also write the results to this file')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    sys.path.insert(0, BENCHMARKS_DIR)
+    if args.child:
+        import fake_cx_oracle
+        fake_cx_oracle.settings.update({'latency': args.latency, 'row_latency': args.row_latency})
+        run_child(args.child, int(args.rows), os.path.abspath(args.data_dir), shlex.split(args.import_args))
+        sys.exit(0)
+
+    data_dir = os.path.abspath(args.data_dir or tempfile.mkdtemp())
+    os.makedirs(data_dir, exist_ok=True)
+    results = []
+    print('%-14s %10s %9s %11s %12s %12s %12s' % ('scenario', 'rows', 'seconds', 'rows/sec', 'peak RSS MB', 'round-trips', 'KB sent'))
+    try:
+        for rows in [int(r) for r in args.rows.split(',')]:
+            for scenario in args.scenarios.split(','):
+                output = subprocess.check_output([
+                    sys.executable, os.path.abspath(__file__), '--child', scenario, '--rows', str(rows),
+                    '--data-dir', data_dir, '--latency', str(args.latency), '--row-latency', str(args.row_latency),
+                    '--import-args', args.import_args])
+                result = json.loads(output.decode().strip().splitlines()[-1])
+                results.append(result)
+                print('%-14s %10d %9.2f %11.0f %12.1f %12d %12.0f' % (
+                    scenario, rows, result['seconds'], rows / result['seconds'], result['peak_rss_mb'],
+                    result['round_trips'], result['bytes_sent'] / 1024.0))
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    if args.json:
+        with open(args.json, 'w') as fp:
+            json.dump(results, fp, indent=2)
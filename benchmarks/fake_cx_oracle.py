@@ -0,0 +1,177 @@
+"""
+Stand-in for the parts of the cx_Oracle API used by `ImportData.py` and `import-oracle.py`.
+
+Nothing is stored. Every call that would be a network round-trip to the database is counted in `stats`
+together with the SQL and bind bytes sent and the rows fetched, and can be made to wait a fixed time
+plus a time per row to model a remote database. SELECT statements are answered from result sets
+registered with `add_result`, or return no rows.
+
+`install()` registers the stand-in as the `cx_Oracle` module, it must run before `ImportData` is imported.
+"""
+import datetime
+import sys
+import threading
+import time
+
+stats = {}
+settings = {'latency': 0.0, 'row_latency': 0.0}
+results = []
+stats_lock = threading.Lock()
+
+
+class DatabaseError(Exception):
+    pass
+
+
+class Error:
+    # The error object cx_Oracle exceptions carry as their only argument.
+    def __init__(self, message):
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+
+class ApiType:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+
+DATETIME = ApiType('DATETIME')
+STRING = ApiType('STRING')
+NUMBER = ApiType('NUMBER')
+
+
+def reset():
+    with stats_lock:
+        stats.clear()
+        stats.update({'round_trips': 0, 'bytes_sent': 0, 'rows_sent': 0, 'rows_fetched': 0,
+                      'connects': 0, 'executes': 0, 'executemany': 0, 'fetches': 0, 'commits': 0, 'rollbacks': 0, 'pings': 0})
+
+
+def round_trip(kind, bytes_sent=0, rows_sent=0, rows_fetched=0):
+    with stats_lock:
+        stats['round_trips'] += 1
+        stats[kind] += 1
+        stats['bytes_sent'] += bytes_sent
+        stats['rows_sent'] += rows_sent
+        stats['rows_fetched'] += rows_fetched
+    delay = settings['latency'] + settings['row_latency'] * (rows_sent + rows_fetched)
+    if delay:
+        time.sleep(delay)
+
+
+def add_result(match, description, rows):
+    """
+    Answer queries containing `match` with `description` and the rows returned by `rows(binds)`.
+    """
+    results.append((match, description, rows))
+
+
+def bind_bytes(values):
+    if isinstance(values, dict):
+        values = values.values()
+    # Dates are sent in the 7 byte Oracle DATE format.
+    return sum([7 if isinstance(v, datetime.datetime) else len(str(v)) for v in values])
+
+
+class Cursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.arraysize = 100
+        self.description = None
+        self.rowcount = 0
+        self.rows = iter([])
+        self.batch_errors = []
+
+    def execute(self, query, binds=None):
+        binds = binds or {}
+        # Queries without a registered result set return no rows, other statements have no description.
+        self.description = [] if query.lstrip().lower().startswith(('select', 'with')) else None
+        self.rows = iter([])
+        for match, description, rows in results:
+            if match in query:
+                self.description = description
+                self.rows = iter(rows(binds))
+                break
+        round_trip('executes', len(query) + bind_bytes(binds))
+
+    def setinputsizes(self, *sizes):
+        # Only recorded on the client, sent with the next execute.
+        self.input_sizes = sizes
+
+    def executemany(self, query, rows, batcherrors=False):
+        if batcherrors and 'APPEND_VALUES' in query:
+            raise DatabaseError(Error('ORA-38910: BATCH ERROR mode is not supported for this operation'))
+        rows = list(rows)
+        self.rowcount = len(rows)
+        self.batch_errors = []
+        round_trip('executemany', len(query) + sum([bind_bytes(row) for row in rows]), rows_sent=len(rows))
+
+    def getbatcherrors(self):
+        return self.batch_errors
+
+    def fetchmany(self, size=None):
+        rows = [row for _, row in zip(range(size or self.arraysize), self.rows)]
+        round_trip('fetches', rows_fetched=len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = list(self.rows)
+        round_trip('fetches', rows_fetched=len(rows))
+        return rows
+
+    def close(self):
+        pass
+
+
+class Connection:
+    def cursor(self):
+        return Cursor(self)
+
+    def commit(self):
+        round_trip('commits')
+
+    def rollback(self):
+        round_trip('rollbacks')
+
+    def ping(self):
+        round_trip('pings')
+
+    def close(self):
+        pass
+
+
+class SessionPool:
+    def __init__(self, user=None, password=None, dsn=None, min=1, max=1, increment=0, threaded=False, encoding=None):
+        self.max = max
+
+    def acquire(self):
+        return connect()
+
+    def release(self, connection):
+        pass
+
+
+def connect(*args, **kwargs):
+    round_trip('connects')
+    return Connection()
+
+
+def makedsn(host, port, sid=None, service_name=None):
+    return '%s:%s/%s' % (host, port, service_name or sid)
+
+
+def install():
+    """
+    Register this module as `cx_Oracle` in `sys.modules` and return it.
+    """
+    module = sys.modules[__name__]
+    sys.modules['cx_Oracle'] = module
+    return module
+
+
+reset()
@@ -0,0 +1,67 @@
+"""
+Synthetic eligibility data modeled on `import_oracle/input.txt`: 21 `~` delimited columns behind a header row.
+
+Rows are generated one at a time from a seeded random generator, so files of millions of rows can be
+written in constant memory and the same arguments always produce the same file.
+
+Usage: python benchmarks/generate_data.py SCL_input.txt [--rows 1000000] [--format txt|xlsx] [--seed 0]
+"""
+import argparse
+import datetime
+import random
+
+import xlsxwriter
+
+COLUMNS = ['CIN', 'AID_CODE', 'PROGRAM', 'CASE_NAME', 'AGE', 'FIRST_NAME', 'LAST_NAME', 'ELIG_END_DATE',
+           'ELIG_START_DATE', 'ELIG_STATUS', 'ACTIVE', 'SEQ_1', 'SEQ_2', 'SEQ_3', 'SEQ_4', 'WORKER_ID',
+           'OFFICE_ID', 'OFFICE_NAME', 'COMMENTS', 'SPECIAL_STATUS', 'VERIFIED']
+FIRST_NAMES = ['Rachel ', 'Jeanine ', 'Maria ', 'James ', 'Linh ', 'Carlos ', 'Aisha ', 'Robert ', 'Mei ', 'Daniel ']
+LAST_NAMES = ['Mietkiewicz ', 'Sanchez ', 'Nguyen ', 'Garcia ', 'Smith ', 'Johnson ', 'Patel ', 'Kim ', 'Lopez ', 'Brown ']
+OFFICES = [('W2FB', 'W2F0 ', 'CalWORKs West '), ('K2FF', 'K2F0 ', 'CalWORKs North '), ('W2DE', 'W2D0 ', 'CalWORKs East '),
+           ('S2QA', 'S2Q0 ', 'CalWORKs East '), ('S2NK', 'S2N0 ', 'SARC ')]
+
+
+def iter_rows(rows, seed=0):
+    """
+    Yield `rows` rows of 21 string values, the same values as `input.txt` uses for blanks and padding.
+    """
+    rnd = random.Random(seed)
+    start = datetime.date(2019, 1, 1)
+    for i in range(rows):
+        worker, office, office_name = OFFICES[rnd.randrange(len(OFFICES))]
+        elig_start = start + datetime.timedelta(days=rnd.randrange(365))
+        yield ['1B%05X' % (i % 0x100000), 'MC', 'Medi-Cal ', ' ', str(rnd.randrange(18, 90)),
+               FIRST_NAMES[rnd.randrange(len(FIRST_NAMES))], LAST_NAMES[rnd.randrange(len(LAST_NAMES))],
+               '12/31/2019', elig_start.strftime('%m/%d/%Y'), 'C' if rnd.random() < 0.78 else 'O', 'Y',
+               '%03d' % rnd.randrange(3), '%03d' % rnd.randrange(3), '000', '000', worker, office, office_name,
+               ' ', 'N' if rnd.random() < 0.89 else 'S', 'YES']
+
+
+def write_delimited(filename, rows, delimiter='~', seed=0):
+    with open(filename, 'w') as fp:
+        fp.write(delimiter.join(COLUMNS) + '\n')
+        for row in iter_rows(rows, seed):
+            fp.write(delimiter.join(row) + '\n')
+
+
+def write_xlsx(filename, rows, seed=0):
+    workbook = xlsxwriter.Workbook(filename, {'constant_memory': True})
+    worksheet = workbook.add_worksheet()
+    worksheet.write_row(0, 0, COLUMNS)
+    for nrow, row in enumerate(iter_rows(rows, seed), 1):
+        worksheet.write_row(nrow, 0, row)
+    workbook.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('filename')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--format', choices=['txt', 'xlsx'], default='txt')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.format == 'xlsx':
+        write_xlsx(args.filename, args.rows, args.seed)
+    else:
+        write_delimited(args.filename, args.rows, seed=args.seed)
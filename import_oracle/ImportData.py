@@ -1,26 +1,111 @@
 import glob
+import csv
+import gzip
+import hashlib
+import importlib
+import io
+import itertools
 import logging
 import json
+import locale
+import mmap
 import sys
-import re
 import os
 import argparse
 import datetime
-from string import ascii_uppercase
-import cx_Oracle
-import xlsxwriter
-from xlsxwriter.utility import xl_rowcol_to_cell
-import openpyxl
+import functools
+import pickle
+import queue
+import re
+import shutil
+import signal
+import sqlite3
 import tempfile
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from decimal import Decimal
+from string import ascii_uppercase
+
+
+class LazyModule:
+    """
+    Stands in for a module imported on first use, so running this module or importing it as a library
+    does not load the database driver before it connects.
+    """
+    def __init__(self, module_name):
+        self.module_name = module_name
+
+    def __getattr__(self, name):
+        return getattr(importlib.import_module(self.module_name), name)
+
+cx_Oracle = LazyModule('cx_Oracle')
 
 parser = argparse.ArgumentParser()
-parser.add_argument("json_file_path", help="Relative path to file or file glob of json data import files")
+parser.add_argument("json_file_path", nargs="?", help="Relative path to file or file glob of json data import files")
 parser.add_argument("--executesql", help="`json_file_path` arg will be parsed as an ExecuteSQL script.", action="store_true")
 parser.add_argument("--selectall", help="Print all rows in table", action="store_true")
+parser.add_argument("--sample-rows", dest="sample_rows", help="With --selectall, print only the first SAMPLE_ROWS rows of the table. Defaults to 0, printing every row", type=int, default=0)
+parser.add_argument("--verify", help="After importing, count the rows of the target table stamped with the S-datetime.now() load time of the run on the server, per S-FILENAME value, and compare them with the rows loaded", action="store_true")
 parser.add_argument("--bootstrap", help="Bootstrap db with provided .sql file. WARNING this will drop the table first.")
 parser.add_argument("--loglevel", help="Log level. Allowed values are [DEBUG, INFO, WARN, ERROR]. Defaults to INFO", default="INFO")
+parser.add_argument("--workers", help="Number of worker processes importing source files or building FileNamePrefixColName export workbooks in parallel, each with its own database session. Defaults to 1", type=int, default=1)
+parser.add_argument("--parse-processes", dest="parse_processes", help="Number of processes parsing and mapping a delimited source file. The file is memory-mapped and split into ranges of whole lines parsed in parallel, their rows are inserted in file order. Defaults to 0, parsing on the reading thread", type=int, default=0)
+parser.add_argument("--inserters", help="Number of threads inserting chunks from a session pool while the source file is read. Defaults to 0, inserting on the reading thread", type=int, default=0)
+parser.add_argument("--adaptive-batches", dest="adaptive_batches", help="Size import chunks by row count from the measured insert and commit latency, using the AdaptiveBatching settings of the descriptor file or their defaults", action="store_true")
+parser.add_argument("--checkpoint-dir", dest="checkpoint_dir", help="Directory of per source file checkpoints. Imports record every committed chunk there and a rerun resumes each file where it stopped")
+parser.add_argument("--delta-dir", dest="delta_dir", help="Incremental load: only insert the rows whose Incremental.KeyColumns are new or whose values changed since the last load, tracked in a row-hash index per target table kept in this directory. Rows are merged on the key, so Incremental.Merge must be \"yes\". Keys missing from a run are reported")
+parser.add_argument("--reload", choices=["truncate", "staging"], help="Full reload of TargetInfo.TableName with direct-path APPEND_VALUES inserts. `truncate` empties the table first, `staging` loads a staging table and only replaces the table contents once every file loaded. Direct-path inserts cannot reject rows individually, a bad row fails its whole chunk")
+parser.add_argument("--rebuild-indexes", dest="rebuild_indexes", help="With --reload, mark the non-unique indexes of the loaded table unusable during the load and rebuild them afterwards", action="store_true")
+parser.add_argument("--sql-sessions", dest="sql_sessions", help="With --executesql, number of pooled sessions running the SQLStatements that share the same Order concurrently. Such a group commits once all of its entries succeeded and the entries before it are committed first, so only the inline entries after the last concurrent group roll back together. Defaults to 1, running every statement in order on a single session", type=int, default=1)
+parser.add_argument("--report-file", dest="report_file", help="Write the JSON run report with the rows, bytes and time of every stage per file to this path")
+parser.add_argument("--metrics-file", dest="metrics_file", help="Path of a Prometheus textfile collector file updated with the stage totals at the end of the run")
+parser.add_argument("--watch", help="Keep running and poll the SourceInfo.Location globs of the import descriptors every WATCH seconds, importing every new file on the same database sessions once it stopped changing", type=float)
+parser.add_argument("--settle-seconds", dest="settle_seconds", help="With --watch, seconds the size and modification time of a new file must stay unchanged before it is imported. Defaults to 5", type=float, default=5.0)
+parser.add_argument("--processed-dir", dest="processed_dir", help="With --watch, directory the imported files are moved to, files that failed go to its `failed` subdirectory. Defaults to a `processed` directory next to every file")
 parser.add_argument("--locked", help="Boolean parameter, when set to true the resulting columns will default to locked. This parameter is only used for exports", action="store_true", default=False)
-args = parser.parse_args()
+
+def parse_args(argv=None, **options):
+    """
+    Returns the options of a run parsed from the command line arguments `argv`, sys.argv by default,
+    with `options` overriding them by destination name. Raises ValueError for unknown or conflicting options.
+    """
+    parsed = parser.parse_args(argv)
+    for name, value in options.items():
+        if not hasattr(parsed, name):
+            raise ValueError('Unknown option %s' % name)
+        setattr(parsed, name, value)
+    if parsed.reload and parsed.checkpoint_dir:
+        raise ValueError("--reload empties the target table, it cannot resume a load from --checkpoint-dir")
+    if parsed.reload and parsed.delta_dir:
+        raise ValueError("--reload empties the target table, it cannot be combined with --delta-dir")
+    if parsed.parse_processes > 1 and parsed.workers > 1:
+        raise ValueError("--parse-processes parses one file at a time in parallel, it cannot be combined with --workers")
+    if parsed.watch and (parsed.reload or parsed.executesql or parsed.selectall or parsed.bootstrap):
+        raise ValueError("--watch only imports source files, it cannot be combined with --reload, --executesql, --selectall or --bootstrap")
+    return parsed
+
+def configure(argv=(), **options):
+    """
+    Set the options the functions of this module run with when they are not handed any, see `parse_args`, and
+    start a new run. Embedding code calls this before `process_descriptor_file`, `process_import` or `process_export`,
+    e.g. `configure(workers=4, adaptive_batches=True)` or `configure(['--reload', 'staging'])`, or passes the options
+    of `parse_args` to them. Returns the options.
+    """
+    set_options(parse_args(list(argv), **options), datetime.datetime.now())
+    return args
+
+def set_options(options, started=None):
+    """
+    Use the `options` returned by `parse_args` and, when given, the `started` time of the run. Also the initializer
+    of worker processes, which do not inherit them when they are spawned rather than forked.
+    """
+    global args, script_execution_time, script_execution_time_str
+    args = options
+    if started:
+        script_execution_time = started
+        script_execution_time_str = started.strftime(date_strftime_fmt)
 
 
 loglevel_mapping = {
@@ -30,17 +115,25 @@ loglevel_mapping = {
     'ERROR': logging.ERROR
 }
 log_format = "%(asctime)s %(levelname)-8s %(message)s"
-logging.basicConfig(
-    format=log_format,
-    level=loglevel_mapping[args.loglevel],
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
 
 logs = logging.getLogger(__name__)
 date_strftime_fmt = '%m/%d/%Y %H:%M:%S'
 oracle_strftime_fmt = 'MM/DD/YY HH24:MI:SS'
 script_execution_time = datetime.datetime.now()
 script_execution_time_str = script_execution_time.strftime(date_strftime_fmt)
+# The default of every option until `configure` or `main` sets them.
+args = parser.parse_args([])
+
+# Database sessions and session pools of the current process, keyed by connection parameters.
+db_connections = {}
+session_pools = {}
+# Process pool of --parse-processes and the row mappers its processes compiled, keyed by their arguments.
+parse_executor = None
+shard_row_mappers = {}
+# Lines of a delimited file parsed by one --parse-processes task, in MaxBytesPerChunk units.
+chunks_per_shard = 16
+# Stage timings are updated by the --inserters threads of a file.
+stage_stats_lock = threading.Lock()
 
 def set_error_log_handler(filename="error"):
     global logs
@@ -48,9 +141,37 @@ def set_error_log_handler(filename="error"):
     err_file = logging.FileHandler('%s.log' % filename, delay=True)
     err_file.setLevel(logging.ERROR)
     err_file.setFormatter(logging.Formatter(log_format))
+    for handler in logs.handlers:
+        handler.close()
     logs.handlers = []
     logs.addHandler(err_file)
 
+def record_stage(stats, stage, seconds, rows=0, nbytes=0):
+    """
+    Add the time, rows and bytes of one run of `stage` to the stage totals in `stats`.
+    """
+    if stats is None:
+        return
+    with stage_stats_lock:
+        stage_stats = stats.get(stage)
+        if stage_stats is None:
+            stage_stats = stats[stage] = {'seconds': 0.0, 'calls': 0, 'rows': 0, 'bytes': 0}
+        stage_stats['seconds'] += seconds
+        stage_stats['calls'] += 1
+        stage_stats['rows'] += rows
+        stage_stats['bytes'] += nbytes
+
+def merge_stages(stats, other):
+    for stage, stage_stats in other.items():
+        merged = stats.setdefault(stage, {'seconds': 0.0, 'calls': 0, 'rows': 0, 'bytes': 0})
+        for key in merged:
+            merged[key] += stage_stats[key]
+    return stats
+
+def format_stages(stats):
+    return ', '.join(['%s %.3fs (%d rows%s)' % (stage, x['seconds'], x['rows'], ', %d bytes' % x['bytes'] if x['bytes'] else '')
+                      for stage, x in stats.items()])
+
 def execute_sql(connection, query, commit=True, rollback_transaction=False):
     logs.debug('Executing SQL query="%s"' % query)
     curs = connection.cursor()
@@ -66,36 +187,411 @@ def execute_sql(connection, query, commit=True, rollback_transaction=False):
         connection.commit()
     pass
 
-def executemany_sql(connection, db_table, fields, rows, commit=True):
-    inserts = '\n'.join(['into %s(%s) values(%s)' % (db_table, ','.join(fields), row) for row in rows])
-    sql_query = """insert all %s SELECT * FROM dual""" % inserts
-    logs.debug('Bulk SQL query="%s"' % sql_query)
+def build_insert_sql(db_table, mapping_list, direct_path=False, load_time=None):
+    """
+    Build a single `INSERT ... VALUES (:1, :2, ...)` statement for `mapping_list`.
+    Constant columns (C-, DBF-, S-datetime.now()) are folded into the statement text once,
+    every other column becomes a bind variable wrapped in its DB_CONVERSION, if any.
+    With `direct_path` the statement carries the APPEND_VALUES hint, every array insert then writes
+    its rows above the high water mark and must be committed before the next one.
+    Returns the statement and the list of (column index, mapping) pairs whose values must be bound per row.
+    """
+    values, bind_mappings = build_insert_values(mapping_list, load_time)
+    sql_query = 'insert %sinto %s(%s) values(%s)' % ('/*+ APPEND_VALUES */ ' if direct_path else '', db_table,
+                                                    ','.join([x['Target'] for x in mapping_list]), ','.join(values))
+    return sql_query, bind_mappings
+
+def build_merge_sql(db_table, mapping_list, key_columns, load_time=None):
+    """
+    Build a `MERGE` statement updating the row of `db_table` matching the `key_columns` of every bound row,
+    or inserting it. The values and binds are the same as those of `build_insert_sql`.
+    """
+    values, bind_mappings = build_insert_values(mapping_list, load_time)
+    columns = [x['Target'] for x in mapping_list]
+    sql_query = 'merge into %s t using (select %s from dual) s on (%s)' % (
+        db_table, ', '.join(['%s %s' % (value, column) for value, column in zip(values, columns)]),
+        ' and '.join(['t.%s = s.%s' % (column, column) for column in key_columns]))
+    updated = [column for column in columns if column not in key_columns]
+    if updated:
+        sql_query += ' when matched then update set %s' % ', '.join(['t.%s = s.%s' % (column, column) for column in updated])
+    sql_query += ' when not matched then insert (%s) values (%s)' % (','.join(columns), ','.join(['s.%s' % column for column in columns]))
+    return sql_query, bind_mappings
+
+def build_insert_values(mapping_list, load_time=None):
+    """
+    Returns the value expression of every column of `mapping_list` and the (column index, mapping) pairs of the binds.
+    S-datetime.now() columns hold `load_time`, the start of the run by default.
+    """
+    values = []
+    bind_mappings = []
+    for column_index, elem in enumerate(mapping_list):
+        e = elem.get('Type')
+        if e.startswith('DBF-'):
+            value = e.replace('DBF-', '')
+        elif e.startswith('C-'):
+            value = e.replace('C-', '').replace("'", "''")
+            if not elem.get('DB_CONVERSION'):
+                value = "'%s'" % value
+        elif e == 'S-datetime.now()':
+            value = "TO_DATE('%s', '%s')" % (load_time.strftime(date_strftime_fmt) if load_time else script_execution_time_str, oracle_strftime_fmt)
+        else:
+            bind_mappings.append((column_index, elem))
+            value = ':%d' % len(bind_mappings)
+            # Conversions `column_conversion` recognizes are applied to the bound values by `convert_chunks`.
+            if elem.get('DB_CONVERSION') and not column_conversion(elem):
+                # The bind variable replaces the quoted '?' placeholder of the conversion template.
+                value = elem['DB_CONVERSION'].replace("'?'", value).replace('?', value)
+            values.append(value)
+            continue
+
+        if elem.get('DB_CONVERSION'):
+            value = elem['DB_CONVERSION'].replace('?', value)
+        values.append(value)
+    return values, bind_mappings
+
+# Oracle datetime format elements and their strptime directives, longest first.
+oracle_date_elements = [('YYYY', '%Y'), ('RRRR', '%Y'), ('HH24', '%H'), ('HH12', '%I'), ('MONTH', '%B'), ('DAY', '%A'),
+                        ('MON', '%b'), ('YY', '%y'), ('RR', '%y'), ('MM', '%m'), ('DD', '%d'), ('DY', '%a'), ('HH', '%I'),
+                        ('MI', '%M'), ('SS', '%S'), ('AM', '%p'), ('PM', '%p')]
+string_functions = {
+    'TRIM': lambda text: text.strip(' '),
+    'LTRIM': lambda text: text.lstrip(' '),
+    'RTRIM': lambda text: text.rstrip(' '),
+    'UPPER': lambda text: text.upper(),
+    'LOWER': lambda text: text.lower()
+}
+data_types = ['string', 'number', 'integer', 'date']
+# A row left out of its chunk on the client, at `offset` in the chunk.
+RejectedRow = namedtuple('RejectedRow', ['offset', 'message'])
+
+def oracle_date_format(fmt):
+    """
+    Translate the Oracle datetime format `fmt` into a strptime format. Returns the format and its two-digit year
+    element (YY or RR) if any, or None when `fmt` uses elements or modifiers that are not translated.
+    """
+    result = ''
+    year = None
+    rest = fmt
+    while rest:
+        for element, directive in oracle_date_elements:
+            if rest.upper().startswith(element):
+                if element in ['YY', 'RR']:
+                    year = element
+                result += directive
+                rest = rest[len(element):]
+                break
+        else:
+            # Like TO_DATE, any run of punctuation in the text matches a separator, see `date_parser`.
+            if rest[0] in ' /-:.,;':
+                result += ' '
+                rest = rest[1:]
+            elif rest[0] == '"' and '"' in rest[1:]:
+                end = rest.index('"', 1)
+                result += re.sub(r'[\W_]+', ' ', rest[1:end])
+                rest = rest[end + 1:]
+            else:
+                return None
+    return re.sub(' +', ' ', result).strip(), year
+
+def two_digit_year(year, element):
+    """
+    Returns the full year Oracle reads for the two-digit `year` with the YY or RR format `element`.
+    """
+    current = datetime.date.today().year
+    century = current // 100 * 100
+    if element == 'RR':
+        if current % 100 < 50:
+            return century + year if year < 50 else century - 100 + year
+        return century + 100 + year if year < 50 else century + year
+    return century + year
+
+def date_parser(fmt):
+    """
+    Returns a function parsing strings in the Oracle datetime format `fmt` into datetimes, or None when `fmt`
+    cannot be translated. Like TO_DATE, YY and RR also accept four-digit years, any punctuation separates the
+    elements, which may also be written without separators, and trailing elements missing from the text
+    default to the current year and month, the first day and midnight.
+    """
+    translated = oracle_date_format(fmt)
+    if not translated:
+        return None
+    strptime_fmt, year = translated
+
+    def match(text, text_fmt):
+        if year:
+            try:
+                return datetime.datetime.strptime(text, text_fmt.replace('%y', '%Y'))
+            except ValueError:
+                pass
+        try:
+            value = datetime.datetime.strptime(text, text_fmt)
+        except ValueError:
+            return None
+        if year:
+            value = value.replace(year=two_digit_year(value.year % 100, year))
+        return value
+
+    def parse(text):
+        normalized = re.sub(r'[\W_]+', ' ', text).strip()
+        text_fmt = ' '.join(strptime_fmt.split(' ')[:normalized.count(' ') + 1])
+        value = match(normalized, text_fmt)
+        if value is None and ' ' not in normalized:
+            text_fmt = strptime_fmt.replace(' ', '')
+            value = match(normalized, text_fmt)
+        if value is None:
+            raise ValueError("'%s' does not match format '%s'" % (text, fmt))
+        today = datetime.date.today()
+        if '%Y' not in text_fmt and '%y' not in text_fmt:
+            value = value.replace(year=today.year)
+        if '%m' not in text_fmt and '%b' not in text_fmt and '%B' not in text_fmt:
+            try:
+                value = value.replace(month=today.month)
+            except ValueError:
+                raise ValueError("'%s' is not a day of the current month" % text)
+        return value
+    return parse
+
+def to_number(value):
+    if isinstance(value, (int, float)):
+        value = str(value)
+    try:
+        number = Decimal(value.strip())
+    except ArithmeticError:
+        raise ValueError('%s is not a number' % value)
+    # Oracle NUMBER holds magnitudes below 1E126.
+    if not number.is_finite() or number.adjusted() >= 126:
+        raise ValueError('%s is not a number' % value)
+    return number
+
+def to_integer(value):
+    number = to_number(value)
+    if number != number.to_integral_value():
+        raise ValueError('%s is not an integer' % value)
+    return int(number)
+
+def parse_conversion(expression):
+    """
+    Recognize the DB_CONVERSION template `expression` of a bound value. Returns the data type it converts the
+    value to, the Oracle date format of TO_DATE and the string functions applied first, innermost first.
+    Returns None for templates that are left to the database.
+    """
+    expression = expression.strip()
+    if expression in ["'?'", '?']:
+        return 'string', None, []
+    match = re.match(r'^(TRIM|LTRIM|RTRIM|UPPER|LOWER)\((.*)\)$', expression, re.I | re.S)
+    if match:
+        inner = parse_conversion(match.group(2))
+        if inner and inner[0] == 'string':
+            return 'string', None, inner[2] + [match.group(1).upper()]
+        return None
+    match = re.match(r"^TO_DATE\((.*),\s*'([^']*)'\)$", expression, re.I | re.S)
+    if match:
+        inner = parse_conversion(match.group(1))
+        if inner and inner[0] == 'string':
+            return 'date', match.group(2), inner[2]
+        return None
+    match = re.match(r'^TO_NUMBER\((.*)\)$', expression, re.I | re.S)
+    if match:
+        inner = parse_conversion(match.group(1))
+        if inner and inner[0] == 'string':
+            return 'number', None, inner[2]
+    return None
+
+def column_conversion(elem):
+    """
+    Returns the client-side conversion of the bound column `elem` as a dict with the function converting a source
+    value into the native value to bind and the type to declare with `setinputsizes`, or None when the value is
+    bound as read. The conversion comes from a recognized DB_CONVERSION template or from the DataType of the
+    column, and is skipped when the column sets ClientConversion to "no".
+    """
+    return settings_conversion(str(elem.get('ClientConversion', 'yes')).lower(), elem.get('DB_CONVERSION'),
+                               elem.get('DataType'), elem.get('Format'))
+
+# The same column settings get the same conversion, and its cache of converted strings, for every file of a run.
+@functools.lru_cache(maxsize=None)
+def settings_conversion(client_conversion, db_conversion, data_type, fmt):
+    if client_conversion in ['no', 'false']:
+        return None
+    if db_conversion:
+        conversion = parse_conversion(db_conversion)
+        # A bare string bind needs no conversion.
+        if not conversion or conversion == ('string', None, []):
+            return None
+        kind, fmt, functions = conversion
+    elif data_type:
+        kind, functions = data_type.lower(), []
+    else:
+        return None
+    parse_date = date_parser(fmt) if kind == 'date' else None
+    if kind == 'date' and not parse_date:
+        return None
+    steps = [string_functions[name] for name in functions]
+
+    # Source columns repeat the same values on many rows, converted strings are cached.
+    @functools.lru_cache(maxsize=4096)
+    def convert_text(text):
+        for step in steps:
+            text = step(text)
+        # Oracle reads empty strings as NULL.
+        if kind != 'string':
+            text = text.strip()
+        if not text:
+            return None
+        if kind == 'date':
+            return parse_date(text)
+        if kind == 'number':
+            return to_number(text)
+        if kind == 'integer':
+            return to_integer(text)
+        return text
+
+    def convert(value):
+        if value.__class__ is str:
+            return convert_text(value)
+        if value is None or (kind == 'date' and isinstance(value, datetime.datetime)):
+            return value
+        if kind in ['number', 'integer'] and isinstance(value, (int, float)) and not steps:
+            return to_number(value) if kind == 'number' else to_integer(value)
+        return convert_text(str(value))
+    return {'convert': convert, 'input_size': {'date': cx_Oracle.DATETIME, 'number': cx_Oracle.NUMBER,
+                                               'integer': cx_Oracle.NUMBER}.get(kind)}
+
+def compile_row_converter(bind_mappings):
+    """
+    Compile the client-side conversions of `bind_mappings` into a function `convert_row(row)` returning the bind
+    row with native values. Returns the function and the input sizes of the binds, or (None, None) when no column
+    is converted.
+    """
+    conversions = [column_conversion(elem) for _, elem in bind_mappings]
+    if not any(conversions):
+        return None, None
+    namespace = {}
+    values = []
+    for n, conversion in enumerate(conversions):
+        if conversion:
+            namespace['c%d' % n] = conversion['convert']
+            values.append('c%d(row[%d])' % (n, n))
+        else:
+            values.append('row[%d]' % n)
+    source = 'def convert_row(row):\n    return (%s)\n' % ''.join(['%s, ' % v for v in values])
+    logs.debug('Compiled row converter:\n%s' % source)
+    exec(source, namespace)
+    namespace['convert_row'].conversions = conversions
+    return namespace['convert_row'], [x['input_size'] if x else None for x in conversions]
+
+def conversion_error(convert_row, columns, row, error):
+    """
+    Returns the reject message of the bind `row` that `convert_row` failed on, naming the first failing column.
+    """
+    for n, conversion in enumerate(convert_row.conversions):
+        if conversion:
+            try:
+                conversion['convert'](row[n])
+            except (ValueError, ArithmeticError) as e:
+                return 'Conversion of %s failed - %s' % (columns[n], e)
+    return 'Conversion failed - %s' % error
+
+def convert_chunks(chunks, load_state):
+    """
+    Convert the bind rows of `chunks` into native values on the client. Rows that fail conversion are written to the
+    reject file and left out of their chunk, the rest of the chunk is inserted. The row numbers of the rows left in
+    a chunk are kept in load_state['row_numbers'] and the count of rows left out is added to load_state['client_rejects'].
+    """
+    convert_row = load_state['convert_row']
+    for row_start, row_end, rows, offset in chunks:
+        started = time.time()
+        converted = []
+        errors = []
+        for n, row in enumerate(rows):
+            try:
+                converted.append(convert_row(row))
+            except (ValueError, ArithmeticError) as e:
+                errors.append(RejectedRow(n, conversion_error(convert_row, load_state['reject_columns'], row, e)))
+        if errors:
+            write_rejects(load_state, row_start, rows, errors)
+            failed = set([x.offset for x in errors])
+            row_numbers = load_state['row_numbers'].get(row_start) or range(row_start, row_start + len(rows))
+            load_state['row_numbers'][row_start] = [x for n, x in enumerate(row_numbers) if n not in failed]
+            if load_state['delta'] and row_start in load_state['delta']['pending']:
+                entries = load_state['delta']['pending'][row_start]
+                load_state['delta']['pending'][row_start] = [x for n, x in enumerate(entries) if n not in failed]
+            load_state['client_rejects'][row_start] = load_state['client_rejects'].get(row_start, 0) + len(errors)
+        record_stage(load_state['stats'], 'convert', time.time() - started, len(rows))
+        yield row_start, row_end, converted, offset
+
+def executemany_sql(connection, sql_query, rows, commit=True, input_sizes=None, batcherrors=True):
+    """
+    Insert `rows` with a single array DML round-trip. Rows rejected by the database do not fail the
+    whole batch, they are returned as the list of batch errors (offset into `rows` and message).
+    Direct-path inserts do not support batch errors, without `batcherrors` a bad row fails the whole batch.
+    `input_sizes` declares the types of the binds converted on the client.
+    """
+    logs.debug('Bulk SQL query="%s" (%d rows)' % (sql_query, len(rows)))
     try:
         curs = connection.cursor()
-        curs.execute(sql_query)
-        connection.commit()
+        if input_sizes:
+            curs.setinputsizes(*input_sizes)
+        curs.executemany(sql_query, rows, batcherrors=batcherrors)
+        batch_errors = curs.getbatcherrors() if batcherrors else []
+        if commit:
+            connection.commit()
     except cx_Oracle.DatabaseError as e:
         errorObj, = e.args
         logs.error("Row %d has error %s" % (curs.rowcount, errorObj.message))
         raise e
+    return batch_errors
 
-def execute_select_sql(connection, query):
+def execute_select_sql(connection, query, binds=None):
     """
     This function will execute the provided `query` and return the results as a list of rows.
     The first row in the results list will be the column names.
     """
     logs.debug('Executing SQL query="%s"' % query)
     curs = connection.cursor()
-    curs.execute(query)
+    curs.execute(query, binds or {})
     column_alias = [c[0] for c in curs.description]
     rows = [list(c) for c in curs.fetchall()]
     rows.insert(0, column_alias)
     return rows
 
-def select_all(connection, db_table):
+def iter_select_sql(connection, query, arraysize=1000, stats=None, batches=False):
+    """
+    This function will execute the provided `query` and return the cursor description and an iterator
+    over the result rows, fetched from the database `arraysize` rows at a time. With `batches` the iterator
+    yields the lists of rows of every fetch instead.
+    The execute and fetch round-trips are timed as the 'query' stage of `stats`.
+    """
+    logs.debug('Executing SQL query="%s"' % query)
+    curs = connection.cursor()
+    curs.arraysize = arraysize
+    started = time.time()
+    curs.execute(query)
+    record_stage(stats, 'query', time.time() - started)
+
+    def fetch_rows():
+        while True:
+            started = time.time()
+            rows = curs.fetchmany()
+            record_stage(stats, 'query', time.time() - started, len(rows))
+            if not rows:
+                break
+            if batches:
+                yield rows
+            else:
+                for row in rows:
+                    yield row
+    return curs.description, fetch_rows()
+
+def select_all(connection, db_table, limit=0):
+    """
+    Print the rows of `db_table`, or only its first `limit` rows, streaming them from the database
+    instead of fetching the whole table first.
+    """
     query = 'SELECT * FROM %s' % db_table
-    rows = execute_select_sql(connection, query)
-    headers = rows.pop(0)
+    if limit:
+        query += ' WHERE ROWNUM <= %d' % limit
+    description, rows = iter_select_sql(connection, query)
+    headers = [c[0] for c in description]
     for header in headers:
         print('%s ' % str(header).ljust(2), end='')
     print('-------------------------------------------------')
@@ -110,311 +606,2167 @@ def create_db_connection(db_host, db_port, db_user, db_pass, db_service, db_enco
     connection = cx_Oracle.connect(db_user, db_pass, dsn, encoding=db_encoding)
     return connection
 
-def convert_xlsx_to_csv(filename):
-    xlsx = openpyxl.load_workbook(filename)
+def iter_xlsx_rows(filename):
+    """
+    Stream the rows of the active sheet in `filename` as lists of native cell values, None for empty cells,
+    skipping hidden rows. Blank rows before the last row with a value are kept, so S-ROWNUM counts sheet rows.
+    The workbook is opened read-only, so memory use does not grow with the size of the sheet.
+    """
+    import openpyxl
+    from openpyxl.worksheet._reader import WorkSheetParser
+    xlsx = openpyxl.load_workbook(filename, read_only=True)
     sheet = xlsx.active
-    data = sheet.rows
-    temp_dir = tempfile.mkdtemp()
-    csv_file = os.path.join(temp_dir, "%s.csv" % os.path.basename(filename).split('.')[0])
-    csv = open(csv_file, "w+")
+    try:
+        # Read-only worksheets do not expose row_dimensions. The row parser records the attributes
+        # of every row as it streams them, which is where the `hidden` flag lives. setup.py pins openpyxl to
+        # the releases this private parser was checked against.
+        with sheet._get_source() as src:
+            parser = WorkSheetParser(src, sheet._shared_strings,
+                                     data_only=xlsx.data_only,
+                                     epoch=xlsx.epoch,
+                                     date_formats=xlsx._date_formats,
+                                     timedelta_formats=xlsx._timedelta_formats)
+            # Rows without cells are left out of the sheet XML, they are yielded once a later row has values.
+            blank_rows = 0
+            last_index = 0
+            for row_index, cells in parser.parse():
+                blank_rows += row_index - last_index - 1
+                last_index = row_index
+                if parser.row_dimensions.get(str(row_index), {}).get('hidden') in ('1', 'true'):
+                    continue
+                if not any([cell['value'] is not None for cell in cells]):
+                    blank_rows += 1
+                    continue
+                for _ in range(blank_rows):
+                    yield []
+                blank_rows = 0
+                row = [None] * cells[-1]['column']
+                for cell in cells:
+                    row[cell['column'] - 1] = cell['value']
+                yield row
+    finally:
+        xlsx.close()
 
-    for i, row in enumerate(data):
-        if sheet.row_dimensions[i+1].hidden:
-            continue
+def read_split_batches(f, delimiter, max_bytes_per_chunk):
+    """
+    Fast path for files without quoting: `max_bytes_per_chunk` worth of lines are read at a time
+    and split on the plain `delimiter` string.
+    """
+    while True:
+        # read/readline rather than readlines, which iterates the file and disables f.tell().
+        data = f.read(max_bytes_per_chunk)
+        if not data:
+            break
+        if not data.endswith('\n'):
+            data += f.readline()
+        lines = data.split('\n')
+        if lines[-1] == '':
+            lines.pop()
+        yield [['' if i == ' ' else i for i in line.rstrip('\r').split(delimiter)] for line in lines], f.tell()
 
-        l = list(row)
-        for i in range(len(l)):
-            cell_value = str(l[i].value) if str(l[i].value) != 'None' else ' '
-            if ',' in cell_value:
-                cell_value = '"%s"' % cell_value
-            if i == len(l) - 1:
-                csv.write(cell_value)
-            else:
-                csv.write(cell_value + ',')
-        csv.write('\n')
-    return csv.name
-
-def map_mapping_types(row, mapping_list, row_num=None, source_filename=None, header=True, header_values=None):
-    row += [''] * (len(header_values) - len(row))
-    row_string = ''
-    for i, elem in enumerate(mapping_list):
-        quoted = True
+def read_csv_batches(f, delimiter, max_bytes_per_chunk):
+    """
+    Quote aware path using the `csv` module, handles quoted delimiters, quotes and newlines.
+    """
+    # Lines are pulled with readline rather than by iterating the file, which keeps f.tell() usable.
+    rows = (['' if i == ' ' else i for i in row] for row in csv.reader(iter(f.readline, ''), delimiter=delimiter))
+    return batch_rows(rows, max_bytes_per_chunk, tell=f.tell)
+
+# Delimited file readers selectable with `SourceInfo.Reader`. Readers yield (rows, offset) batches, where
+# offset is the position of the file after the batch, used to resume a file with `--checkpoint-dir`.
+delimited_readers = {
+    'split': read_split_batches,
+    'csv': read_csv_batches
+}
+
+def batch_rows(rows, max_bytes_per_chunk, tell=None):
+    """
+    Group `rows` into (rows, offset) batches holding roughly `max_bytes_per_chunk` bytes of cell data each.
+    The offset is the value of `tell()` after the batch, or None without `tell`.
+    """
+    batch = []
+    batch_bytes = 0
+    for row in rows:
+        batch.append(row)
+        batch_bytes += sum([len(str(v)) + 1 for v in row])
+        if batch_bytes >= max_bytes_per_chunk:
+            yield batch, tell() if tell else None
+            batch = []
+            batch_bytes = 0
+    if batch:
+        yield batch, tell() if tell else None
+
+def source_filename_value(column_type, source_filename):
+    """
+    Returns the value of the `S-FILENAME.<start>.<end>` column type: characters start to end of the file name.
+    """
+    _, start, end = tuple(column_type.split('.'))
+    return os.path.basename(source_filename)[int(start)-1:int(end)]
+
+def compile_row_mapper(mapping_list, source_filename=None, header=True, header_values=None):
+    """
+    Compile the bind mappings returned by `build_insert_sql` into a function `map_row(row, row_num)`
+    returning the tuple of bind values for one source row.
+    Source column indices and S-FILENAME slices are resolved once here, so the per-row work is a
+    single generated tuple expression.
+    """
+    namespace = {}
+    values = []
+    width = len(header_values) if header_values else 0
+    for i, elem in mapping_list:
         e = elem.get('Type')
-        if e.startswith('DBF-'):
-            cell_value = e.replace('DBF-', '')
-            quoted = False
-        elif e.startswith('C-'):
-            cell_value = e.replace('C-', '')
-        elif e == 'S-datetime.now()':
-            cell_value = "TO_DATE('%s', '%s')" % (script_execution_time_str, oracle_strftime_fmt)
-            quoted = False
-        elif e.startswith('S-FILENAME'):
-            _, i, e = tuple(e.split('.'))
-            cell_value = os.path.basename(source_filename)[int(i)-1:int(e)]
+        if e.startswith('S-FILENAME'):
+            name = 'c%d' % len(namespace)
+            namespace[name] = source_filename_value(e, source_filename)
+            values.append(name)
         elif e == 'S-ROWNUM':
-            cell_value = row_num
+            values.append('row_num')
         else: # Default to 'S' column type.
             if header:
-                source_column = int(header_values.index(elem['Source']))
+                source_column = header_values.index(elem['Source'])
             else:
                 source_column = i
-            cell_value = str(row[source_column]).replace("'", "''")
+            width = max(width, source_column + 1)
+            values.append('row[%d]' % source_column)
 
-        # Check for db_mapping parameter
-        if elem.get('DB_CONVERSION'):
-            cell_value = elem['DB_CONVERSION'].replace('?', cell_value)
-            quoted=False
-        if quoted:
-            row_string = "%s,'%s'" % (row_string, cell_value)
-        else:
-            row_string = "%s,%s" % (row_string, cell_value)
-    return row_string.lstrip(',')
+    namespace['width'] = width
+    # Missing trailing values bind as NULL, None also keeps typed columns of native xlsx values free of ''.
+    namespace['padding'] = [None] * width
+    source = (
+        'def map_row(row, row_num):\n'
+        '    if len(row) < width:\n'
+        '        row = row + padding[len(row):]\n'
+        '    return (%s)\n' % ''.join(['%s, ' % v for v in values])
+    )
+    logs.debug('Compiled row mapper:\n%s' % source)
+    exec(source, namespace)
+    return namespace['map_row']
 
-def process_descriptor_file(descriptor_file):
+def load_descriptor_file(descriptor_file, options=None):
+    """
+    Parse and validate `descriptor_file` once for the whole run. Raises ValueError naming every missing setting
+    for the modes the descriptor and the `options` of the run, the configured ones by default, ask for.
+    """
+    options = options or args
     with open(descriptor_file, 'r') as fp:
         descriptor_file_data = json.load(fp)
-        if 'FileName' in descriptor_file_data['TargetInfo']:
-            process_export(descriptor_file)
-        if 'DBServer' in descriptor_file_data['TargetInfo']:
-            process_import(descriptor_file)
+    missing = []
 
-def process_export(descriptor_file):
-    logs.info('Processing export for %s' % descriptor_file)
-    with open(descriptor_file, 'r') as fp:
-        descriptor_file_data = json.load(fp)
-        if 'SourceInfo' in descriptor_file_data:
-            db_host = descriptor_file_data['SourceInfo']['DBServer']
-            db_port = int(descriptor_file_data['SourceInfo']['DBPort'])
-            db_schema = descriptor_file_data['SourceInfo']['Schema']
-            db_service = descriptor_file_data['SourceInfo']['DBService']
-            db_user = descriptor_file_data['SourceInfo']['UserName']
-            db_pass = descriptor_file_data['SourceInfo']['PassWord']
-            db_sql_query = descriptor_file_data['SourceInfo']['SQL']
-            db_encoding = descriptor_file_data['SourceInfo'].get('DBEncoding', 'UTF-8')
-            db_filename_prefix_col = descriptor_file_data['SourceInfo'].get('FileNamePrefixColName')
-        if 'TargetInfo' in descriptor_file_data:
-            source_location = descriptor_file_data['TargetInfo']['Location']
-            source_file = descriptor_file_data['TargetInfo']['FileName']
-            date_format = descriptor_file_data['TargetInfo'].get('DateFmt', '{:%m/%d/%y %H:%M:%S}')
-            unlocked_columns = descriptor_file_data['TargetInfo'].get('UnlockedColumns', [])
-    connection = create_db_connection(db_host, db_port, db_user, db_pass, db_service, db_encoding)
-    sorted_col_mappings = sorted(descriptor_file_data['ColMappings'], key=lambda k: int(k.get('Order') or sys.maxsize))
-    hidden_columns = descriptor_file_data.get('HideColumns', [])
+    def require(section, keys):
+        values = descriptor_file_data.get(section) if section else descriptor_file_data
+        if not isinstance(values, dict):
+            missing.append(section)
+            return
+        missing.extend(['%s.%s' % (section, key) if section else key for key in keys if key not in values])
+
+    db_keys = ['DBServer', 'DBPort', 'DBService', 'UserName', 'PassWord']
+    require('TargetInfo', [])
+    target_info = descriptor_file_data.get('TargetInfo') or {}
+    if 'FileName' in target_info:
+        require('SourceInfo', db_keys + ['SQL'])
+        require('TargetInfo', ['Location'])
+        require(None, ['ColMappings'])
+    if 'DBServer' in target_info:
+        require('TargetInfo', db_keys + ['Schema'])
+        if options.executesql:
+            require(None, ['SQLStatements'])
+        elif options.bootstrap or options.selectall:
+            require('TargetInfo', ['TableName'])
+        else:
+            require('TargetInfo', ['TableName'])
+            require('SourceInfo', ['Location', 'FileType', 'FileHeader'])
+            if options.delta_dir:
+                require('Incremental', ['KeyColumns'])
+                # Changed rows are resent, so a plain INSERT would duplicate them.
+                if str((descriptor_file_data.get('Incremental') or {}).get('Merge', 'no')).lower() not in {'yes', 'true'}:
+                    raise ValueError('--delta-dir resends changed rows and needs Incremental.Merge set to "yes"')
+            require(None, ['MaxBytesPerChunk', 'ColMappings'])
+            missing.extend(['ColMappings[%d].%s' % (n, key) for n, elem in enumerate(descriptor_file_data.get('ColMappings', []))
+                            for key in ['Target', 'Type'] if key not in elem])
+    for n, elem in enumerate(descriptor_file_data.get('ColMappings') or []):
+        if 'DataType' not in elem:
+            continue
+        if elem['DataType'].lower() not in data_types:
+            raise ValueError('unsupported ColMappings[%d].DataType "%s", allowed values are %s' % (n, elem['DataType'], data_types))
+        if elem.get('DB_CONVERSION'):
+            raise ValueError('ColMappings[%d] sets both DataType and DB_CONVERSION' % n)
+        if elem['DataType'].lower() == 'date' and not (elem.get('Format') and oracle_date_format(elem['Format'])):
+            raise ValueError('ColMappings[%d].Format "%s" is not a supported Oracle date format' % (n, elem.get('Format', '')))
+    if 'FileName' in target_info and target_info.get('Format', 'xlsx').lower() not in ['xlsx'] + sorted(export_delimiters):
+        raise ValueError('unsupported TargetInfo.Format "%s", allowed values are %s' % (target_info['Format'], ['xlsx'] + sorted(export_delimiters)))
+    if not missing and not ('FileName' in target_info or 'DBServer' in target_info):
+        missing.append('TargetInfo.FileName or TargetInfo.DBServer')
+    if missing:
+        raise ValueError('missing settings %s' % ', '.join(missing))
+    return descriptor_file_data
+
+def process_descriptor_file(descriptor_file, executor=None, descriptor_file_data=None, options=None):
+    """
+    Run the export and/or import described by `descriptor_file` with the `options` returned by `parse_args`,
+    the configured ones by default. Returns the import results to be passed to `log_import_summary` and the
+    list of export summaries.
+    """
+    options = options or args
+    results = []
+    exports = []
+    if descriptor_file_data is None:
+        descriptor_file_data = load_descriptor_file(descriptor_file, options)
+    if 'FileName' in descriptor_file_data['TargetInfo']:
+        exports.append(process_export(descriptor_file, executor, descriptor_file_data, options))
+    if 'DBServer' in descriptor_file_data['TargetInfo']:
+        results = process_import(descriptor_file, executor, descriptor_file_data, options=options)
+    return results, exports
 
-    data = execute_select_sql(connection, db_sql_query.replace('~', '"'))
-    headers = data.pop(0)
+def create_export_workbook(filename, plan, db_filename_prefix_col=None):
+    """
+    Open a protected, constant memory workbook with the header row written. Rows must then be written
+    in order, which lets xlsxwriter flush every finished row to disk instead of keeping the sheet in memory.
+    """
+    import xlsxwriter
+    logs.info('Opening %s for writing' % filename)
+    workbook = xlsxwriter.Workbook(filename, {'constant_memory': True})
+    locked = workbook.add_format()
+    locked.set_locked(True)
 
-    file_prefixes_unique = [''] # Single element as empty string so the for-loop will process once with no prefix
+    unlocked = workbook.add_format()
+    unlocked.set_locked(False)
+    worksheet = workbook.add_worksheet()
+    worksheet.protect()
+    header_format = workbook.add_format({
+        'border': 1,
+        'bg_color': '#C6EFCE',
+        'bold': True,
+        'text_wrap': True,
+        'valign': 'vcenter',
+        'indent': 1
+    })
+    header_format.set_locked(False)
+    headers = plan['headers']
+    # Set column width based on header size
+    for i in range(len(headers)):
+        worksheet.set_column(i, i, len(headers[i]) + 5)
+    worksheet.write_row('A1', headers, header_format)
+
+    # Hide filename prefix column - if any
     if db_filename_prefix_col:
-        filename_prefix_index = headers.index(db_filename_prefix_col)
-        used=set()
-        file_prefixes = [row[filename_prefix_index] for row in data if row]
-        file_prefixes_unique = [x for x in file_prefixes if x not in used and (used.add(x) or True)]
-
-    logs.debug('File prefixes determined: %s' % file_prefixes_unique)
-    workbooks = []
-    for file_prefix in file_prefixes_unique:
-        if db_filename_prefix_col:
-            workbook_name = '%s-%s' % (file_prefix, source_file)
+        worksheet.set_column(headers.index(db_filename_prefix_col), headers.index(db_filename_prefix_col), None, None, {'hidden': True})
+
+    return {
+        'workbook': workbook,
+        'worksheet': worksheet,
+        'name': filename,
+        'locked': locked,
+        'unlocked': unlocked,
+        'column_formats': [locked if x == 'locked' else unlocked for x in plan['cell_formats']],
+        'nrow': 1 # Start at one, skip header row
+    }
+
+def read_export_settings(descriptor_file_data, options):
+    source_info = descriptor_file_data['SourceInfo']
+    target_info = descriptor_file_data['TargetInfo']
+    return {
+        'db_info': (source_info['DBServer'], int(source_info['DBPort']), source_info['UserName'], source_info['PassWord'],
+                    source_info['DBService'], source_info.get('DBEncoding', 'UTF-8')),
+        'db_sql_query': source_info['SQL'],
+        'db_filename_prefix_col': source_info.get('FileNamePrefixColName'),
+        'db_arraysize': int(source_info.get('ArraySize', 1000)),
+        # When the SQL orders rows by FileNamePrefixColName every workbook is closed as soon as its prefix ends.
+        'ordered_by_prefix': str(source_info.get('OrderedByPrefix', 'no')).lower() in {'yes', 'true'},
+        'source_location': target_info['Location'],
+        'source_file': target_info['FileName'],
+        'format': target_info.get('Format', 'xlsx').lower(),
+        'delimiter': target_info.get('Delimiter', export_delimiters.get(target_info.get('Format', 'xlsx').lower())),
+        'gzip': str(target_info.get('Gzip', 'no')).lower() in {'yes', 'true'},
+        'date_format': target_info.get('DateFmt', '{:%m/%d/%y %H:%M:%S}'),
+        'unlocked_columns': target_info.get('UnlockedColumns', []),
+        'locked': options.locked,
+        'sorted_col_mappings': sorted(descriptor_file_data['ColMappings'], key=lambda k: int(k.get('Order') or sys.maxsize)),
+        'hidden_columns': descriptor_file_data.get('HideColumns', [])
+    }
+
+# Delimited text formats of `TargetInfo.Format` besides xlsx, with their default `TargetInfo.Delimiter`.
+export_delimiters = {
+    'csv': ',',
+    'tsv': '\t'
+}
+
+def export_workbook_name(settings, prefix):
+    if settings['db_filename_prefix_col']:
+        return os.path.join(settings['source_location'], '%s-%s' % (prefix, settings['source_file']))
+    return os.path.join(settings['source_location'], settings['source_file'])
+
+def describe_columns(description):
+    """
+    Returns the column names of a cursor `description` and the kind of every column: 'datetime' for
+    date and timestamp columns, 'other' for any other type and None when the driver reports no type.
+    """
+    headers = [c[0] for c in description]
+    column_kinds = []
+    for column in description:
+        if len(column) < 2 or column[1] is None:
+            column_kinds.append(None)
+        elif column[1] == cx_Oracle.DATETIME:
+            column_kinds.append('datetime')
         else:
-            workbook_name = source_file
-        logs.info('Opening %s for writing' % os.path.join(source_location, workbook_name))
-        workbook = xlsxwriter.Workbook(os.path.join(source_location, workbook_name))
-        locked = workbook.add_format()
-        locked.set_locked(True)
-
-        unlocked = workbook.add_format()
-        unlocked.set_locked(False)
-        workbooks.append({
-            'workbook': workbook,
-            'name': os.path.join(source_location, workbook_name),
-            'prefix': file_prefix
-        })
-        worksheet = workbook.add_worksheet()
-        worksheet.protect()
-        header_format = workbook.add_format({
-            'border': 1,
-            'bg_color': '#C6EFCE',
-            'bold': True,
-            'text_wrap': True,
-            'valign': 'vcenter',
-            'indent': 1
+            column_kinds.append('other')
+    return headers, column_kinds
+
+def build_export_plan(headers, column_kinds, settings):
+    """
+    Decide once per export how every column is written: the value converter and whether the cell is locked.
+    """
+    date_format = settings['date_format']
+
+    def format_date(item):
+        return date_format.format(item) if item is not None else item
+
+    def format_if_date(item):
+        return date_format.format(item) if isinstance(item, datetime.datetime) else item
+
+    converters = []
+    cell_formats = []
+    for ncolumn, header in enumerate(headers):
+        if column_kinds[ncolumn] == 'datetime':
+            converters.append((ncolumn, format_date))
+        elif column_kinds[ncolumn] is None:
+            converters.append((ncolumn, format_if_date))
+        if header in settings['unlocked_columns']:
+            cell_formats.append('unlocked')
+        elif settings['locked']:
+            cell_formats.append('locked')
+        else:
+            cell_formats.append('unlocked')
+    logs.debug('Export columns %s written with formats %s' % (headers, cell_formats))
+    return {
+        'headers': headers,
+        'converters': converters,
+        'cell_formats': cell_formats,
+        # Rows are written with a single write_row call when every column shares the same format.
+        'uniform_format': cell_formats[0] if len(set(cell_formats)) == 1 else None,
+        'debug': logs.isEnabledFor(logging.DEBUG)
+    }
+
+def write_export_row(export, row, plan):
+    if plan['debug']:
+        logs.debug('Inserting row %s into spreadsheet' % (row,))
+    if plan['converters']:
+        row = list(row)
+        for ncolumn, convert in plan['converters']:
+            row[ncolumn] = convert(row[ncolumn])
+    if plan['uniform_format']:
+        export['worksheet'].write_row(export['nrow'], 0, row, export[plan['uniform_format']])
+    else:
+        write = export['worksheet'].write
+        nrow = export['nrow']
+        for ncolumn, item in enumerate(row):
+            write(nrow, ncolumn, item, export['column_formats'][ncolumn])
+    export['nrow'] += 1
+
+def get_ddlist_values(connection, col_mapping, db_filename_prefix_col, prefix, ddlist_cache, stats=None):
+    """
+    Returns the dropdown list values of `col_mapping` for the workbook of `prefix`, cached in `ddlist_cache`.
+    Queries without the `^` placeholder run once per export. The others run once per prefix with the prefix
+    as a bind variable, so every execution shares the same statement text.
+    """
+    ddlist_query = col_mapping['DDListSQL']
+    key = (col_mapping['Target'], prefix if '^' in ddlist_query else None)
+    if key not in ddlist_cache:
+        binds = {}
+        if '^' in ddlist_query:
+            ddlist_query = ddlist_query.replace('^', 'WHERE %s = :prefix' % db_filename_prefix_col)
+            binds = {'prefix': prefix}
+        started = time.time()
+        rows = execute_select_sql(connection, ddlist_query, binds)[1:] # Skipping header row with [1:]
+        ddlist_cache[key] = [value for row in rows for value in row]
+        record_stage(stats, 'ddlist', time.time() - started, len(rows))
+    return ddlist_cache[key]
+
+def ddlist_mappings(settings):
+    return [x for x in settings['sorted_col_mappings'] if 'DDList' in x and x['DDList'].lower() in {'yes', 'true'}]
+
+def finish_export_workbook(connection, export, headers, settings, prefix, ddlist_cache, stats=None):
+    """
+    Append the dropdown lists, hide columns and close the workbook of `prefix`.
+    """
+    from xlsxwriter.utility import xl_rowcol_to_cell
+    name = export['name']
+    worksheet = export['worksheet']
+    db_filename_prefix_col = settings['db_filename_prefix_col']
+
+    # Create Dropdown lists if needed.
+    for col_mapping in ddlist_mappings(settings):
+        logs.info('Applying dropdown list validation on column "%s" in workbook %s' % (col_mapping['Source'], name))
+        unique_elements_in_column = get_ddlist_values(connection, col_mapping, db_filename_prefix_col, prefix, ddlist_cache, stats)
+        column_index = headers.index(col_mapping['Target'])
+
+        # The hidden list rows follow the data rows, constant memory mode requires writing them in order.
+        ddlist_row = export['nrow']
+        worksheet.set_row(ddlist_row, None, None, {'hidden': True})
+        worksheet.write_row(xl_rowcol_to_cell(ddlist_row, 0), unique_elements_in_column)
+        worksheet.data_validation(1, column_index, 1048575, column_index, {
+            'validate': 'list',
+            'source': '=%s:%s' % (xl_rowcol_to_cell(ddlist_row, 0, row_abs=True, col_abs=True), xl_rowcol_to_cell(ddlist_row, len(unique_elements_in_column), row_abs=True, col_abs=True))
         })
-        header_format.set_locked(False)
-        # Set column width based on header size
-        worksheet.write_row('A1', headers, header_format)
-        for i in range(len(headers)):
-            worksheet.set_column(i, i, len(headers[i]) + 5)
+        export['nrow'] += 1
+
+    # Hide columns if specified
+    for hcolumn in settings['hidden_columns']:
+        column_index = headers.index(hcolumn['Column'])
+        logs.info('Hidding column %d[%s]' % (column_index, hcolumn))
+        worksheet.set_column(column_index, column_index, None, None, {'hidden': True})
+
+    logs.info('Closing %s.' % name)
+    started = time.time()
+    export['workbook'].close()
+    record_stage(stats, 'close', time.time() - started, 0, os.path.getsize(name))
+
+def open_export_text(filename, plan, settings):
+    """
+    Open a delimited text export, gzip compressed with `TargetInfo.Gzip`, with the header row written.
+    """
+    logs.info('Opening %s for writing' % filename)
+    if settings['gzip']:
+        # Level 6 compresses about as well as 9 at a fraction of the CPU time.
+        fp = gzip.open(filename, 'wt', compresslevel=6, encoding='utf-8', newline='')
+    else:
+        fp = open(filename, 'w', encoding='utf-8', newline='')
+    writer = csv.writer(fp, delimiter=settings['delimiter'], lineterminator='\n')
+    writer.writerow(plan['headers'])
+    return {'file': fp, 'writer': writer, 'name': filename, 'rows': 0}
+
+def close_export_text(export, stats=None):
+    logs.info('Closing %s.' % export['name'])
+    started = time.time()
+    export['file'].close()
+    record_stage(stats, 'close', time.time() - started, 0, os.path.getsize(export['name']))
+
+def export_delimited(settings, headers, column_kinds, batches, summary):
+    """
+    Stream the fetched `batches` of rows into one delimited text file, or one per file prefix, writing every
+    batch with a single `writerows` call. Dates are formatted with `TargetInfo.DateFmt`, workbook settings
+    such as dropdown lists, hidden and unlocked columns do not apply.
+    """
+    stats = summary['stages']
+    plan = build_export_plan(headers, column_kinds, settings)
+    converters = plan['converters']
+    db_filename_prefix_col = settings['db_filename_prefix_col']
+    filename_prefix_index = headers.index(db_filename_prefix_col) if db_filename_prefix_col else None
+    exports = {}
+    finished_prefixes = set()
+
+    def convert(row):
+        row = list(row)
+        for ncolumn, converter in converters:
+            row[ncolumn] = converter(row[ncolumn])
+        return row
+
+    # Writing is timed as the whole loop less the fetches and file closes done within it.
+    started = time.time()
+    other_seconds = sum([x['seconds'] for x in stats.values()])
+    try:
+        for rows in batches:
+            if converters:
+                rows = [convert(row) for row in rows]
+            if filename_prefix_index is None:
+                groups = {'': rows}
+            else:
+                groups = {}
+                for row in rows:
+                    groups.setdefault(row[filename_prefix_index], []).append(row)
+            for file_prefix, prefix_rows in groups.items():
+                export = exports.get(file_prefix)
+                if export is None:
+                    if settings['ordered_by_prefix']:
+                        if file_prefix in finished_prefixes:
+                            raise ValueError('SourceInfo.OrderedByPrefix is set but the SQL does not order rows by %s, prefix %s came back twice' % (db_filename_prefix_col, file_prefix))
+                        for prefix in list(exports):
+                            close_export_text(exports.pop(prefix), stats)
+                            finished_prefixes.add(prefix)
+                            summary['workbooks'].append(export_workbook_name(settings, prefix))
+                    export = exports[file_prefix] = open_export_text(export_workbook_name(settings, file_prefix), plan, settings)
+                export['writer'].writerows(prefix_rows)
+                summary['rows'] += len(prefix_rows)
+        if not exports and not finished_prefixes and not db_filename_prefix_col:
+            exports[''] = open_export_text(export_workbook_name(settings, ''), plan, settings)
+        record_stage(stats, 'write', time.time() - started - (sum([x['seconds'] for x in stats.values()]) - other_seconds), summary['rows'])
+    finally:
+        for export in exports.values():
+            close_export_text(export, stats)
+            summary['workbooks'].append(export['name'])
+
+def export_prefix_partition(settings, headers, column_kinds, prefix, spill_file, ddlist_cache):
+    """
+    Build the workbook of `prefix` with the export `settings` from the rows spilled to `spill_file` by `process_export`.
+    Runs in a `--workers` worker process, the dropdown list values are prefetched into `ddlist_cache`.
+    Returns the workbook name, its row count and the stage timings of the worker.
+    """
+    stats = {}
+    plan = build_export_plan(headers, column_kinds, settings)
+    export = create_export_workbook(export_workbook_name(settings, prefix), plan, settings['db_filename_prefix_col'])
+    started = time.time()
+    with open(spill_file, 'rb') as fp:
+        while True:
+            try:
+                rows = pickle.load(fp)
+            except EOFError:
+                break
+            for row in rows:
+                write_export_row(export, row, plan)
+    nrows = export['nrow'] - 1
+    record_stage(stats, 'write', time.time() - started, nrows)
+    finish_export_workbook(None, export, headers, settings, prefix, ddlist_cache, stats)
+    return {'name': export['name'], 'rows': nrows, 'stages': stats}
+
+def process_export(descriptor_file, executor=None, descriptor_file_data=None, options=None):
+    """
+    Export the rows of `SourceInfo.SQL` into one workbook, or one per file prefix, with the `options` returned by
+    `parse_args`, the configured ones by default.
+    Returns a summary dict with the workbooks written, the row count and the stage timings.
+    """
+    options = options or args
+    logs.info('Processing export for %s' % descriptor_file)
+    export_started = time.time()
+    if descriptor_file_data is None:
+        descriptor_file_data = load_descriptor_file(descriptor_file, options)
+    settings = read_export_settings(descriptor_file_data, options)
+    db_filename_prefix_col = settings['db_filename_prefix_col']
+    connection = get_db_connection(*settings['db_info'])
+    summary = {'export': descriptor_file, 'workbooks': [], 'rows': 0, 'seconds': 0.0, 'stages': {}}
+    stats = summary['stages']
+
+    description, data = iter_select_sql(connection, settings['db_sql_query'].replace('~', '"'), settings['db_arraysize'], stats,
+                                        batches=settings['format'] != 'xlsx')
+    headers, column_kinds = describe_columns(description)
+    if settings['format'] != 'xlsx':
+        # Writing delimited text costs little next to fetching the rows, prefixes are not handed to --workers.
+        export_delimited(settings, headers, column_kinds, data, summary)
+        summary['seconds'] = time.time() - export_started
+        logs.info('Export stages: %s' % format_stages(stats))
+        return summary
+    if db_filename_prefix_col:
+        filename_prefix_index = headers.index(db_filename_prefix_col)
+        if executor:
+            for workbook in export_prefix_partitions(connection, settings, headers, column_kinds, data, filename_prefix_index, executor, stats):
+                summary['workbooks'].append(workbook['name'])
+                summary['rows'] += workbook['rows']
+                merge_stages(stats, workbook['stages'])
+            summary['seconds'] = time.time() - export_started
+            logs.info('Export stages: %s' % format_stages(stats))
+            return summary
+    else:
+        filename_prefix_index = None
+    plan = build_export_plan(headers, column_kinds, settings)
+
+    # Workbooks are opened as their file prefix first shows up in the streamed rows.
+    # Without a prefix column a single workbook is written under the empty prefix.
+    workbooks = {}
+    ddlist_cache = {}
+    finished_prefixes = set()
+    if not db_filename_prefix_col:
+        workbooks[''] = create_export_workbook(export_workbook_name(settings, ''), plan)
+
+    # Writing is timed as the whole loop less the fetches and workbook closes done within it,
+    # which keeps timer calls out of the per-row path.
+    started = time.time()
+    other_seconds = sum([x['seconds'] for x in stats.values()])
+    for row in data:
+        file_prefix = row[filename_prefix_index] if db_filename_prefix_col else ''
+        export = workbooks.get(file_prefix)
+        if export is None:
+            if settings['ordered_by_prefix']:
+                if file_prefix in finished_prefixes:
+                    raise ValueError('SourceInfo.OrderedByPrefix is set but the SQL does not order rows by %s, prefix %s came back twice' % (db_filename_prefix_col, file_prefix))
+                for prefix in list(workbooks):
+                    finish_export_workbook(connection, workbooks.pop(prefix), headers, settings, prefix, ddlist_cache, stats)
+                    finished_prefixes.add(prefix)
+                    summary['workbooks'].append(export_workbook_name(settings, prefix))
+            export = workbooks[file_prefix] = create_export_workbook(export_workbook_name(settings, file_prefix), plan, db_filename_prefix_col)
+        write_export_row(export, row, plan)
+        summary['rows'] += 1
+    record_stage(stats, 'write', time.time() - started - (sum([x['seconds'] for x in stats.values()]) - other_seconds), summary['rows'])
 
-        nrow = 1 # Start at one, skip header row
+    for prefix, export in workbooks.items():
+        finish_export_workbook(connection, export, headers, settings, prefix, ddlist_cache, stats)
+        summary['workbooks'].append(export['name'])
+    summary['seconds'] = time.time() - export_started
+    logs.info('Export stages: %s' % format_stages(stats))
+    return summary
+
+def export_prefix_partitions(connection, settings, headers, column_kinds, data, filename_prefix_index, executor, stats=None):
+    """
+    Partition the streamed rows by file prefix in a single pass into spill files, then build and close
+    every prefix workbook independently in the worker processes of `executor`.
+    Returns the results of `export_prefix_partition` for every prefix.
+    """
+    spill_rows = settings['db_arraysize']
+    spill_dir = tempfile.mkdtemp()
+    try:
+        spill_files = {}
+        spill_buffers = {}
+        started = time.time()
+        query_seconds = stats['query']['seconds'] if stats and 'query' in stats else 0.0
+        nrows = 0
         for row in data:
-            if db_filename_prefix_col and (row[filename_prefix_index] != file_prefix):
-                # Move on to next file prefix
-                continue
-            logs.debug('Inserting row %s into spreadsheet' % row)
-            ncolumn = 0
-            for item in row:
-                if isinstance(item, datetime.datetime):
-                    item = date_format.format(item)
-                if headers[ncolumn] in unlocked_columns:
-                    logs.debug('Writing unlocked cell in column %d[%s]' % (ncolumn, headers[ncolumn]))
-                    worksheet.write(nrow, ncolumn, item, unlocked)
-                elif args.locked:
-                    logs.debug('Writing locked cell in column %d[%s] due to --unlocked parameter' % (ncolumn, headers[ncolumn]))
-                    worksheet.write(nrow, ncolumn, item, locked)
-                else:
-                    logs.debug('Writing unlocked cell in column %d[%s]' % (ncolumn, headers[ncolumn]))
-                    worksheet.write(nrow, ncolumn, item, unlocked)
-                ncolumn += 1
-            nrow += 1
-
-        # Hide filename prefix column - if any
-        if db_filename_prefix_col:
-            worksheet.set_column(headers.index(db_filename_prefix_col), headers.index(db_filename_prefix_col), None, None, {'hidden': True})
-
-    # Iterate through all workbooks.
-    for workbook in workbooks:
-        prefix = workbook['prefix']
-        name = workbook['name']
-        workbook = workbook['workbook']
-        hidden_row_counter = 1
-        worksheet = workbook.worksheets()[0]
-
-        # Create Dropdown lists if needed.
-        for col_mapping in sorted_col_mappings:
-            if 'DDList' in col_mapping and col_mapping['DDList'].lower() in {'yes', 'true'}:
-                logs.info('Applying dropdown list validation on column "%s" in workbook %s' % (col_mapping['Source'], name))
-                ddlist_query = col_mapping['DDListSQL']
-                if '^' in ddlist_query:
-                    ddlist_query = ddlist_query.replace('^', "WHERE %s = '%s'" % (db_filename_prefix_col, prefix))
-                unique_elements_in_column = execute_select_sql(connection, ddlist_query)[1:] # Skipping header row with [1:]
-                unique_elements_in_column = sum([x for x in unique_elements_in_column],[])
-                column_index = headers.index(col_mapping['Target'])
-
-                worksheet.write_row(xl_rowcol_to_cell(len(data) + hidden_row_counter, 0), unique_elements_in_column)
-                worksheet.data_validation(1, column_index, 1048575, column_index, {
-                    'validate': 'list',
-                    'source': '=%s:%s' % (xl_rowcol_to_cell(len(data) + hidden_row_counter, 0, row_abs=True, col_abs=True), xl_rowcol_to_cell(len(data) + hidden_row_counter, len(unique_elements_in_column), row_abs=True, col_abs=True))
-                })
-                worksheet.set_row(len(data) + hidden_row_counter, None, None, {'hidden': True})
-                hidden_row_counter += 1
-
-        # Hide columns if specified
-        for hcolumn in hidden_columns:
-            column_index = headers.index(hcolumn['Column'])
-            logs.info('Hidding column %d[%s]' % (column_index, hcolumn))
-            worksheet.set_column(column_index, column_index, None, None, {'hidden': True})
-
-        logs.info('Closing %s.' % os.path.join(source_location, source_file))
-        workbook.close()
-
-def process_import(descriptor_file):
+            nrows += 1
+            file_prefix = row[filename_prefix_index]
+            buffer = spill_buffers.get(file_prefix)
+            if buffer is None:
+                buffer = spill_buffers[file_prefix] = []
+                spill_files[file_prefix] = open(os.path.join(spill_dir, '%d.spill' % len(spill_files)), 'wb')
+            buffer.append(row)
+            if len(buffer) >= spill_rows:
+                pickle.dump(buffer, spill_files[file_prefix], pickle.HIGHEST_PROTOCOL)
+                buffer.clear()
+        for file_prefix, fp in spill_files.items():
+            if spill_buffers[file_prefix]:
+                pickle.dump(spill_buffers[file_prefix], fp, pickle.HIGHEST_PROTOCOL)
+            fp.close()
+        if stats is not None:
+            record_stage(stats, 'partition', time.time() - started - (stats['query']['seconds'] - query_seconds), nrows)
+        logs.info('Rows partitioned into %d file prefix(es), building workbooks' % len(spill_files))
+
+        # Dropdown list values are fetched once here and handed to the workers with their partition.
+        ddlist_cache = {}
+        futures = []
+        for file_prefix, fp in spill_files.items():
+            for col_mapping in ddlist_mappings(settings):
+                get_ddlist_values(connection, col_mapping, settings['db_filename_prefix_col'], file_prefix, ddlist_cache, stats)
+            prefix_ddlist_cache = {k: v for k, v in ddlist_cache.items() if k[1] in (file_prefix, None)}
+            futures.append(executor.submit(export_prefix_partition, settings, headers, column_kinds, file_prefix, fp.name, prefix_ddlist_cache))
+        workbooks = []
+        for future in futures:
+            workbooks.append(future.result())
+            logs.info('Workbook %s written.' % workbooks[-1]['name'])
+        return workbooks
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+def process_import(descriptor_file, executor=None, descriptor_file_data=None, import_files=None, options=None):
     # descriptor_file arg should be a relative path to a .json
     # file with all the required info to handle the data import.
+    # import_files restricts the import to these files instead of every file matching SourceInfo.Location,
+    # an incremental load then does not report deleted keys.
+    # options are the options returned by parse_args, the configured ones by default.
+    options = options or args
     logs.info('Processing import for %s' % descriptor_file)
-    with open(descriptor_file, 'r') as fp:
-        descriptor_file_data = json.load(fp)
-        if 'TargetInfo' in descriptor_file_data:
-            db_host = descriptor_file_data['TargetInfo']['DBServer']
-            db_port = int(descriptor_file_data['TargetInfo']['DBPort'])
-            db_schema = descriptor_file_data['TargetInfo']['Schema']
-            db_service = descriptor_file_data['TargetInfo']['DBService']
-            db_user = descriptor_file_data['TargetInfo']['UserName']
-            db_pass = descriptor_file_data['TargetInfo']['PassWord']
-            db_table = descriptor_file_data['TargetInfo'].get('TableName')
-            db_encoding = descriptor_file_data['TargetInfo'].get('DBEncoding', 'UTF-8')
-        if 'SourceInfo' in descriptor_file_data:
-            source_file = descriptor_file_data['SourceInfo']['Location']
-            source_delimeter = descriptor_file_data['SourceInfo'].get('Delimiter', ',')
-            source_filetype = descriptor_file_data['SourceInfo']['FileType']
-            source_fileheader = True if descriptor_file_data['SourceInfo']['FileHeader'].lower() == 'yes' else False
-            MAX_BYTES_PER_CHUNK = descriptor_file_data['MaxBytesPerChunk']
-
-    connection = create_db_connection(db_host, db_port, db_user, db_pass, db_service, db_encoding)
-    if args.bootstrap:
+    if descriptor_file_data is None:
+        descriptor_file_data = load_descriptor_file(descriptor_file, options)
+    db_host = descriptor_file_data['TargetInfo']['DBServer']
+    db_port = int(descriptor_file_data['TargetInfo']['DBPort'])
+    db_schema = descriptor_file_data['TargetInfo']['Schema']
+    db_service = descriptor_file_data['TargetInfo']['DBService']
+    db_user = descriptor_file_data['TargetInfo']['UserName']
+    db_pass = descriptor_file_data['TargetInfo']['PassWord']
+    db_table = descriptor_file_data['TargetInfo'].get('TableName')
+    db_encoding = descriptor_file_data['TargetInfo'].get('DBEncoding', 'UTF-8')
+    if 'SourceInfo' in descriptor_file_data:
+        source_reader = descriptor_file_data['SourceInfo'].get('Reader', 'csv').lower()
+        source_filetype = descriptor_file_data['SourceInfo']['FileType']
+
+    if options.checkpoint_dir:
+        # Every file saves its checkpoint before its first insert, the directory has to exist by then.
+        os.makedirs(options.checkpoint_dir, exist_ok=True)
+    connection = None
+    if options.bootstrap or options.selectall or options.executesql or options.reload or not (executor or options.inserters):
+        connection = get_db_connection(db_host, db_port, db_user, db_pass, db_service, db_encoding)
+    if options.bootstrap:
         if not db_table:
             logs.error('TargetInfo.TableName not provided in JSON descriptor file.')
-            return
-        with open(args.bootstrap, 'r') as fp:
+            return []
+        with open(options.bootstrap, 'r') as fp:
             try:
                 execute_sql(connection, "DROP TABLE %s.%s" % (db_schema, db_table))
             except:
                 pass
-            for sql_command in fp.read().split(';'):
+            for sql_command in split_sql_script(fp.read()):
                 execute_sql(connection, sql_command)
-    if args.selectall:
+    if options.selectall:
         if not db_table:
             logs.error('TargetInfo.TableName not provided in JSON descriptor file.')
-            return
-        select_all(connection, db_table)
-        return
+            return []
+        select_all(connection, db_table, options.sample_rows)
+        return []
 
-    if args.executesql:
+    if options.executesql:
         logs.info("Running 'ExecuteSQL' method on %s" % descriptor_file)
         set_error_log_handler('{filename}-{date:%Y-%m-%d_%H-%M-%S}'.format(
             filename='executesql-errors',
             date=script_execution_time
         ))
         sorted_sql_statements = sorted(descriptor_file_data['SQLStatements'], key=lambda k: int(k.get('Order') or sys.maxsize))
-        for sql in sorted_sql_statements:
-            commit = sql is sorted_sql_statements[-1]
-            if sql.get('SQLSource', 'inline').lower() == 'inline':
-                execute_sql(connection, sql['SQL'].rstrip(';'), commit=commit, rollback_transaction=True)
-            else:
-                sql_source_file = os.path.join(os.path.dirname(__file__), sql['SQLSourceFile'])
-                logs.info("Processing SQLSourceFile %s" % sql_source_file)
-                with open(sql_source_file, 'r') as fp:
-                    file_sql_statements = fp.read().split(';')
-
-                    # If the sql file ends in a ';' we will end up with an empty string SQL query so we're removing that here
-                    try:
-                        file_sql_statements.remove('')
-                    except ValueError:
-                        pass
-                    for sql in file_sql_statements:
-                        commit = sql is file_sql_statements[-1]
-                        execute_sql(connection, sql.strip('\n'), commit=commit, rollback_transaction=True)
-        return
+        groups = group_sql_entries(sorted_sql_statements, options.sql_sessions)
+        for n, group in enumerate(groups):
+            if len(group) > 1:
+                # The pooled sessions do not see uncommitted work of this session.
+                connection.commit()
+                run_sql_group(get_session_pool(db_host, db_port, db_user, db_pass, db_service, db_encoding, size=options.sql_sessions), group)
+                continue
+            sql = group[0]
+            # Every SQLSourceFile is committed once all its statements ran, inline statements with the last entry.
+            commit = n == len(groups) - 1 or sql.get('SQLSource', 'inline').lower() != 'inline'
+            run_sql_statements(connection, read_sql_entry(sql), commit=commit)
+        return []
 
-    import_file_path = os.path.join(os.path.dirname(__file__), source_file)
-    for import_file in glob.glob(import_file_path):
-        logs.info("Processing %s" % import_file)
-        set_error_log_handler('{filename}-{date:%Y-%m-%d_%H-%M-%S}'.format(
-            filename=os.path.basename(import_file).split('.')[0],
-            date=script_execution_time
-        ))
-        if source_filetype == 'xlsx':
-            logs.info('Converting %s to temporary csv' % import_file)
-            import_file = convert_xlsx_to_csv(import_file)
-            logs.info('Temporary csv created - %s' % import_file)
+    if source_filetype != 'xlsx' and source_reader not in delimited_readers:
+        logs.error('Unsupported SourceInfo.Reader "%s". Allowed values are %s' % (source_reader, sorted(delimited_readers)))
+        return []
 
-        sorted_col_mappings = sorted(descriptor_file_data['ColMappings'], key=lambda k: int(k.get('Order') or sys.maxsize))
-        header_values = None
-        regex_pattern = re.compile(r'''%s(?=(?:[^"]*"[^"]*")*[^"]*$)''' % source_delimeter)
-        with open(import_file, 'r') as f:
-            if source_fileheader:
-                header_values = next(f)
-                header_values = regex_pattern.split(header_values.strip())
-                header_values = ['' if i == ' ' else i for i in header_values]
-            row_counter=1
+    import_file_path = source_file_pattern(descriptor_file_data)
+    all_files = import_files is None
+    if all_files:
+        import_files = glob.glob(import_file_path)
+    reload_state = None
+    if options.reload:
+        if not import_files:
+            logs.error('No source file matches %s, %s is not reloaded' % (import_file_path, db_table))
+            return []
+        reload_state = prepare_reload(connection, options, db_schema, db_table, descriptor_file_data['TargetInfo'].get('StagingTableName'))
+        # The files are loaded into the staging table, or straight into the truncated table.
+        descriptor_file_data = dict(descriptor_file_data, TargetInfo=dict(descriptor_file_data['TargetInfo'], TableName=reload_state['load_table']))
+    # Every file of an incremental run marks the keys it holds with the run, the keys left unmarked were deleted.
+    delta_run = '{date:%Y%m%d%H%M%S%f}-{pid}'.format(date=datetime.datetime.now(), pid=os.getpid()) if options.delta_dir else None
+    # Every --watch poll stamps its rows with its own load time, --verify tells them apart by it.
+    load_time = datetime.datetime.now() if options.watch else script_execution_time
+    results = []
+    for import_file in import_files:
+        if executor:
+            results.append(executor.submit(import_source_file, descriptor_file_data, import_file, None, delta_run, load_time, options))
+        else:
+            results.append(import_source_file(descriptor_file_data, import_file, connection, delta_run, load_time, options))
+    if reload_state:
+        results = [result.result() if isinstance(result, Future) else result for result in results]
+        finish_reload(connection, reload_state, results)
+    if delta_run and all_files and import_files:
+        results = [result.result() if isinstance(result, Future) else result for result in results]
+        report_deleted_keys(descriptor_file_data, delta_run, results, options.delta_dir)
+    if options.verify and import_files:
+        results = [result.result() if isinstance(result, Future) else result for result in results]
+        connection = connection or get_db_connection(db_host, db_port, db_user, db_pass, db_service, db_encoding)
+        verify_import(connection, descriptor_file_data, db_table, results, load_time)
+    return results
+
+def verify_import(connection, descriptor_file_data, db_table, summaries, load_time=None):
+    """
+    Compare the rows the `summaries` of an import loaded with the rows of `db_table` stamped with the `load_time`
+    of the import, counted on the server per value of the first S-FILENAME column. Only the counts are fetched.
+    Sets 'verified' in every summary and returns the list of (S-FILENAME value, rows loaded, rows found)
+    that differ, or None when no S-datetime.now() column tells the rows of the run apart.
+    """
+    sorted_col_mappings = sorted(descriptor_file_data['ColMappings'], key=lambda k: int(k.get('Order') or sys.maxsize))
+    values, _ = build_insert_values(sorted_col_mappings, load_time)
+    # The rows are matched with the same expression that stamped them.
+    load_columns = [(elem['Target'], value) for elem, value in zip(sorted_col_mappings, values) if elem['Type'] == 'S-datetime.now()']
+    if not load_columns:
+        logs.warning('No S-datetime.now() column is mapped to %s, the loaded rows cannot be verified' % db_table)
+        return None
+    load_column, load_value = load_columns[0]
+    # A DB_CONVERSION makes the stored value differ from the file name slice, those rows are only counted in total.
+    group = next((elem for elem in sorted_col_mappings if elem['Type'].startswith('S-FILENAME') and not elem.get('DB_CONVERSION')), None)
+    group_of = lambda summary: source_filename_value(group['Type'], summary['file']) if group else None
+    expected = {}
+    for summary in summaries:
+        expected[group_of(summary)] = expected.get(group_of(summary), 0) + summary['rows_loaded']
+    if group:
+        query = 'SELECT %s, COUNT(*) FROM %s WHERE %s = %s GROUP BY %s' % (group['Target'], db_table, load_column, load_value, group['Target'])
+    else:
+        query = 'SELECT NULL, COUNT(*) FROM %s WHERE %s = %s' % (db_table, load_column, load_value)
+    started = time.time()
+    found = dict([(key, count) for key, count in execute_select_sql(connection, query)[1:]])
+    mismatches = []
+    for key in sorted(expected, key=str):
+        if expected[key] == found.get(key, 0):
+            logs.info('Verified %d row(s) in %s%s' % (expected[key], db_table, ' for %s %s' % (group['Target'], key) if group else ''))
+        else:
+            logs.error('%d row(s) were loaded into %s%s but %d row(s) were found' % (
+                expected[key], db_table, ' for %s %s' % (group['Target'], key) if group else '', found.get(key, 0)))
+            mismatches.append((key, expected[key], found.get(key, 0)))
+    for summary in summaries:
+        summary['verified'] = group_of(summary) not in [x[0] for x in mismatches]
+    logs.info('Verification of %s took %.3fs' % (db_table, time.time() - started))
+    return mismatches
+
+def source_file_pattern(descriptor_file_data):
+    return os.path.join(os.path.dirname(__file__), descriptor_file_data['SourceInfo']['Location'])
+
+def prepare_reload(connection, options, db_schema, db_table, staging_table=None):
+    """
+    Empty the table the `--reload` of `options` loads into: `db_table` itself with `--reload truncate`, or a
+    staging table created empty with the columns of `db_table` with `--reload staging`. With `--rebuild-indexes`
+    the non-unique indexes of the loaded table are then marked unusable.
+    Returns the reload state dict passed on to `finish_reload`.
+    """
+    reload_state = {
+        'schema': db_schema,
+        'table': db_table,
+        'load_table': db_table,
+        'unusable_indexes': [],
+        'mode': options.reload,
+        'rebuild_indexes': options.rebuild_indexes
+    }
+    if options.reload == 'staging':
+        # Oracle identifiers are limited to 30 characters before 12.2.
+        reload_state['load_table'] = staging_table or '%s_STG' % db_table[:26]
+        logs.info('Creating staging table %s.%s for %s' % (db_schema, reload_state['load_table'], db_table))
+        try:
+            execute_sql(connection, 'DROP TABLE %s.%s PURGE' % (db_schema, reload_state['load_table']))
+        except cx_Oracle.DatabaseError:
+            pass
+        # NOLOGGING with direct-path inserts keeps the staging load out of the redo log.
+        execute_sql(connection, 'CREATE TABLE %s.%s NOLOGGING AS SELECT * FROM %s.%s WHERE 1 = 0' % (
+            db_schema, reload_state['load_table'], db_schema, db_table))
+    else:
+        logs.info('Truncating %s.%s' % (db_schema, db_table))
+        execute_sql(connection, 'TRUNCATE TABLE %s.%s' % (db_schema, db_table))
+        if options.rebuild_indexes:
+            reload_state['unusable_indexes'] = set_indexes_unusable(connection, db_schema, db_table)
+    if options.workers > 1 or options.inserters > 1:
+        logs.warning('Direct-path inserts lock %s for the duration of every chunk, --workers and --inserters sessions load it one at a time' % reload_state['load_table'])
+    return reload_state
+
+def set_indexes_unusable(connection, db_schema, db_table):
+    """
+    Mark the valid non-unique, non-partitioned indexes of `db_table` unusable, so loads skip maintaining them.
+    Unique indexes stay usable, the database still has to enforce them. Returns the names of the indexes.
+    """
+    rows = execute_select_sql(connection, "SELECT index_name FROM all_indexes WHERE owner = :owner AND table_name = :table_name "
+                                          "AND uniqueness = 'NONUNIQUE' AND partitioned = 'NO' AND index_type NOT IN ('LOB', 'IOT - TOP') "
+                                          "AND status = 'VALID'", {'owner': db_schema.upper(), 'table_name': db_table.upper()})[1:]
+    indexes = [row[0] for row in rows]
+    for index_name in indexes:
+        logs.info('Marking index %s.%s unusable' % (db_schema, index_name))
+        execute_sql(connection, 'ALTER INDEX %s.%s UNUSABLE' % (db_schema, index_name))
+    return indexes
+
+def rebuild_indexes(connection, db_schema, indexes):
+    for index_name in indexes:
+        logs.info('Rebuilding index %s.%s' % (db_schema, index_name))
+        started = time.time()
+        execute_sql(connection, 'ALTER INDEX %s.%s REBUILD' % (db_schema, index_name))
+        logs.info('Index %s.%s rebuilt in %.1fs' % (db_schema, index_name, time.time() - started))
+
+def finish_reload(connection, reload_state, summaries):
+    """
+    Complete a `--reload` once every source file is loaded. With `--reload staging` the table is only replaced
+    when no file failed: it is truncated and filled from the staging table with a single direct-path
+    INSERT ... SELECT, which keeps its grants, constraints, triggers and dependent views intact.
+    Unusable indexes are rebuilt in every case, so a failed load never leaves them unusable.
+    """
+    db_schema = reload_state['schema']
+    db_table = reload_state['table']
+    # Rows rejected by the database are in the reject files, only files or chunks that failed stop the reload.
+    failed = [x for x in summaries if x['error'] or x.get('chunks_failed')]
+    try:
+        if reload_state['mode'] == 'staging':
+            if failed:
+                logs.error('%d file(s) did not load completely, %s.%s is left unchanged and the loaded rows are kept in %s.%s' % (
+                    len(failed), db_schema, db_table, db_schema, reload_state['load_table']))
+                return
+            logs.info('Replacing the rows of %s.%s with %s.%s' % (db_schema, db_table, db_schema, reload_state['load_table']))
+            started = time.time()
+            execute_sql(connection, 'TRUNCATE TABLE %s.%s' % (db_schema, db_table))
+            if reload_state['rebuild_indexes']:
+                reload_state['unusable_indexes'] = set_indexes_unusable(connection, db_schema, db_table)
+            try:
+                execute_sql(connection, 'INSERT /*+ APPEND */ INTO %s.%s SELECT * FROM %s.%s' % (db_schema, db_table, db_schema, reload_state['load_table']))
+            except cx_Oracle.DatabaseError:
+                logs.error('Filling %s.%s failed, its new rows are kept in %s.%s' % (db_schema, db_table, db_schema, reload_state['load_table']))
+                raise
+            execute_sql(connection, 'DROP TABLE %s.%s PURGE' % (db_schema, reload_state['load_table']))
+            logs.info('%s.%s replaced in %.1fs' % (db_schema, db_table, time.time() - started))
+        elif failed:
+            logs.error('%d file(s) did not load completely into %s.%s' % (len(failed), db_schema, db_table))
+    finally:
+        rebuild_indexes(connection, db_schema, reload_state['unusable_indexes'])
+
+# Statements opening a PL/SQL block, which runs up to a line holding a single `/` rather than up to a `;`.
+plsql_block_start = re.compile(r'(DECLARE|BEGIN|CREATE\s+(OR\s+REPLACE\s+)?((NON)?EDITIONABLE\s+)?'
+                               r'(FUNCTION|PROCEDURE|PACKAGE|TRIGGER|TYPE|LIBRARY))\b', re.IGNORECASE)
+q_quote_delimiters = {'[': ']', '{': '}', '<': '>', '(': ')'}
+
+def strip_sql_comments(statement):
+    """
+    Returns `statement` without its leading whitespace and comments.
+    """
+    while True:
+        statement = statement.lstrip()
+        if statement.startswith('--'):
+            statement = statement.partition('\n')[2]
+        elif statement.startswith('/*'):
+            statement = statement.partition('*/')[2]
+        else:
+            return statement
+
+def split_sql_script(script):
+    """
+    Split a SQL script into its statements. A statement ends with a `;` outside of string literals, quoted
+    identifiers and comments, or with a line holding a single `/`. PL/SQL blocks and stored program units only
+    end with a `/` line, or the end of the script, and keep their semicolons.
+    Returns the statements without their terminator, PL/SQL blocks keep the `;` of their final END.
+    """
+    statements = []
+    start = 0
+    i = 0
+    plsql = None
+    length = len(script)
+    while i < length:
+        c = script[i]
+        if plsql is None and not c.isspace() and not script.startswith('--', i) and not script.startswith('/*', i) \
+                and not (c == '/' and script[i:].partition('\n')[0].strip() == '/'):
+            plsql = bool(plsql_block_start.match(script, i))
+        if script.startswith('--', i):
+            i = script.find('\n', i)
+            i = length if i < 0 else i
+            continue
+        if script.startswith('/*', i):
+            i = script.find('*/', i + 2)
+            i = length if i < 0 else i + 2
+            continue
+        if c == "'":
+            if i > 0 and script[i - 1] in 'qQ' and i + 1 < length and (i < 2 or not (script[i - 2].isalnum() or script[i - 2] == '_')):
+                # q'[...]' literal, it ends with the closing delimiter followed by a quote.
+                close = q_quote_delimiters.get(script[i + 1], script[i + 1]) + "'"
+                i = script.find(close, i + 2)
+                i = length if i < 0 else i + 2
+                continue
+            i += 1
+            while i < length:
+                if script[i] == "'":
+                    if script.startswith("''", i):
+                        i += 2
+                        continue
+                    break
+                i += 1
+            i += 1
+            continue
+        if c == '"':
+            i = script.find('"', i + 1)
+            i = length if i < 0 else i + 1
+            continue
+        if c == ';' and not plsql:
+            statements.append(script[start:i])
+            start = i + 1
+            plsql = None
+        elif c == '/' and script[script.rfind('\n', 0, i) + 1:i].strip() == '' and script[i + 1:].partition('\n')[0].strip() == '':
+            statements.append(script[start:i])
+            i = script.find('\n', i)
+            i = length if i < 0 else i
+            start = i
+            plsql = None
+            continue
+        i += 1
+    statements.append(script[start:])
+    return [x.strip() for x in statements if strip_sql_comments(x)]
+
+def sql_statement_kind(statement):
+    """
+    Returns 'dml' for INSERT, UPDATE, DELETE and MERGE statements, 'plsql' for PL/SQL blocks and program units
+    and 'other' for queries, DDL and every other statement.
+    """
+    statement = strip_sql_comments(statement)
+    if plsql_block_start.match(statement):
+        return 'plsql'
+    keyword = statement.split(None, 1)[0].upper() if statement else ''
+    return 'dml' if keyword in {'INSERT', 'UPDATE', 'DELETE', 'MERGE'} else 'other'
+
+def batch_sql_statements(statements, max_batch=100):
+    """
+    Group runs of consecutive DML statements into anonymous PL/SQL blocks of up to `max_batch` statements,
+    each block runs in a single round-trip. Returns (first statement number, last statement number, SQL) tuples.
+    """
+    batches = []
+    for n, statement in enumerate(statements, 1):
+        dml = sql_statement_kind(statement) == 'dml'
+        if dml and batches and batches[-1][2] and len(batches[-1][3]) < max_batch:
+            batches[-1][1] = n
+            batches[-1][3].append(statement)
+        else:
+            batches.append([n, n, dml, [statement]])
+    # A statement ending with a line comment gets its semicolon on a line of its own.
+    return [(first, last, batch[0] if len(batch) == 1 else 'BEGIN\n%s\nEND;' % '\n'.join([x + ('\n;' if '--' in x.rsplit('\n', 1)[-1] else ';') for x in batch]))
+            for first, last, dml, batch in batches]
+
+def read_sql_entry(sql):
+    """
+    Returns the statements of one `SQLStatements` entry, inline or read from its SQLSourceFile.
+    """
+    if sql.get('SQLSource', 'inline').lower() == 'inline':
+        return split_sql_script(sql['SQL'])
+    sql_source_file = os.path.join(os.path.dirname(__file__), sql['SQLSourceFile'])
+    logs.info("Processing SQLSourceFile %s" % sql_source_file)
+    with open(sql_source_file, 'r') as fp:
+        return split_sql_script(fp.read())
+
+def run_sql_statements(connection, statements, commit=True):
+    """
+    Run `statements` on `connection` with consecutive DML batched into PL/SQL blocks. On failure the
+    transaction is rolled back and the error raised. With `commit` the transaction is committed at the end,
+    otherwise it is left to the caller.
+    """
+    for first, last, sql_query in batch_sql_statements(statements):
+        if first != last:
+            logs.info('Running statements %d-%d in one PL/SQL block' % (first, last))
+        try:
+            execute_sql(connection, sql_query, commit=False, rollback_transaction=True)
+        except Exception as e:
+            logs.error('Statement(s) %d-%d failed: %s' % (first, last, e))
+            raise e
+    if commit:
+        logs.debug('Committing SQL Transaction.')
+        connection.commit()
+
+def group_sql_entries(sorted_sql_statements, max_group):
+    """
+    Group the sorted `SQLStatements` entries sharing the same Order, `max_group` entries at most so that every
+    entry of a group gets a pooled session. Entries without an Order are groups of their own.
+    """
+    groups = []
+    for sql in sorted_sql_statements:
+        if groups and sql.get('Order') and groups[-1][0].get('Order') == sql['Order'] and len(groups[-1]) < max_group:
+            groups[-1].append(sql)
+        else:
+            groups.append([sql])
+    return groups
+
+def run_sql_group(pool, entries):
+    """
+    Run the independent `entries` of one Order group concurrently, each on its own session of `pool`.
+    The sessions are only committed once every entry succeeded, otherwise all of them are rolled back and the
+    first error raised. Statements that implicitly commit, like DDL, cannot be rolled back.
+    """
+    sessions = [pool.acquire() for sql in entries]
+    try:
+        with ThreadPoolExecutor(max_workers=len(entries)) as sql_executor:
+            futures = [sql_executor.submit(run_sql_statements, session, read_sql_entry(sql), False) for session, sql in zip(sessions, entries)]
+        errors = [future.exception() for future in futures if future.exception()]
+        if errors:
+            logs.error('Order group %s failed, rolling back its %d session(s).' % (entries[0].get('Order'), len(sessions)))
+            # `run_sql_statements` already rolled back the sessions of the failed entries.
+            for session, future in zip(sessions, futures):
+                if not future.exception():
+                    session.rollback()
+            raise errors[0]
+        for session in sessions:
+            session.commit()
+    finally:
+        for session in sessions:
+            pool.release(session)
+
+def get_db_connection(db_host, db_port, db_user, db_pass, db_service, db_encoding):
+    """
+    Returns the session of the current process for the given database, connecting on first use. Every
+    descriptor of the run pointing at the same database shares it. A session that no longer answers
+    a ping is replaced.
+    """
+    key = (db_host, db_port, db_user, db_service, db_encoding)
+    if key in db_connections:
+        try:
+            db_connections[key].ping()
+            return db_connections[key]
+        except cx_Oracle.DatabaseError:
+            logs.info('Session to database %s@%s lost, reconnecting' % (db_user, db_host))
+    db_connections[key] = create_db_connection(db_host, db_port, db_user, db_pass, db_service, db_encoding)
+    return db_connections[key]
+
+def close_db_connections():
+    for key, connection in list(db_connections.items()):
+        try:
+            connection.close()
+        except cx_Oracle.DatabaseError:
+            pass
+        del db_connections[key]
+
+def get_session_pool(db_host, db_port, db_user, db_pass, db_service, db_encoding, size):
+    """
+    Returns a session pool of `size` sessions for the given database, creating it on first use.
+    """
+    key = (db_host, db_port, db_user, db_service, db_encoding)
+    if key not in session_pools:
+        logs.info("Creating session pool of %d sessions to database %s@%s" % (size, db_user, db_host))
+        dsn = cx_Oracle.makedsn(db_host, db_port, service_name=db_service)
+        session_pools[key] = cx_Oracle.SessionPool(user=db_user, password=db_pass, dsn=dsn, min=size, max=size,
+                                                   increment=0, threaded=True, encoding=db_encoding)
+    return session_pools[key]
+
+def timed_batches(batches, stats, offset=None):
+    """
+    Yield the (rows, offset) `batches` of a reader, recording the time spent reading and parsing every batch
+    as the 'read' stage of `stats`. Bytes are counted from the offsets of delimited files, starting at `offset`.
+    """
+    batches = iter(batches)
+    while True:
+        started = time.time()
+        try:
+            batch, batch_offset = next(batches)
+        except StopIteration:
+            return
+        nbytes = batch_offset - offset if batch_offset is not None and offset is not None else 0
+        record_stage(stats, 'read', time.time() - started, len(batch), nbytes)
+        offset = batch_offset
+        yield batch, batch_offset
+
+def map_chunks(batches, map_row, max_bytes_per_chunk, first_row=1, skip_row=None, stats=None):
+    """
+    Map `batches` of source rows into chunks of (first row number, last row number, bind rows, offset).
+    Rows for which `skip_row(row_num)` is true are left out, splitting the batch into contiguous chunks.
+    Only a chunk ending with its batch carries the file offset of the batch.
+    """
+    row_counter=first_row
+    for batch, offset in batches:
+        if not batch:
+            continue
+        logs.info("Reading %d bytes from input file - %d row(s)" % (max_bytes_per_chunk, len(batch)))
+        started = time.time()
+        row_counter_start=row_counter
+        bulk_row_insert = []
+        for data in batch:
+            if skip_row and skip_row(row_counter):
+                if bulk_row_insert:
+                    yield row_counter_start, row_counter-1, bulk_row_insert, None
+                    bulk_row_insert = []
+                row_counter += 1
+                row_counter_start = row_counter
+                continue
+            bulk_row_insert.append(map_row(data, row_counter))
+            row_counter += 1
+        record_stage(stats, 'map', time.time() - started, len(batch))
+        if bulk_row_insert:
+            yield row_counter_start, row_counter-1, bulk_row_insert, offset
+
+def next_line_start(mm, start, position, delimiter=None):
+    """
+    Returns the offset right after the first newline of the memory-mapped file `mm` at or after `position`,
+    or its size. `start` is the start of a record. With the csv `delimiter`, newlines inside quoted fields are
+    skipped. Like the `csv` module, a `"` only opens a quoted field at the start of a field, elsewhere it is a
+    literal character, and `""` inside a quoted field is an escaped quote. The scan jumps from quote to quote.
+    """
+    if delimiter is None:
+        newline = mm.find(b'\n', position)
+        return len(mm) if newline == -1 else newline + 1
+    field_starts = [delimiter.encode(), b'\n', b'\r']
+    size = len(mm)
+    pos = start
+    while True:
+        quote = mm.find(b'"', pos)
+        newline = mm.find(b'\n', max(pos, position))
+        if newline == -1:
+            newline = size
+        if quote == -1 or quote > newline:
+            return min(newline + 1, size)
+        if quote == start or mm[quote - 1:quote] in field_starts:
+            # Skip to the closing quote of the field, past escaped quotes.
+            pos = quote + 1
             while True:
-                row_counter_start=row_counter
-                bulk_row_insert = []
-                lines = f.readlines(MAX_BYTES_PER_CHUNK)
-                if not lines:
+                quote = mm.find(b'"', pos)
+                if quote == -1:
+                    return size
+                if mm[quote + 1:quote + 2] != b'"':
                     break
-                logs.info("Reading %d bytes from input file - %d row(s)" % (MAX_BYTES_PER_CHUNK, len(lines)))
-                for line in lines:
-                    data = regex_pattern.split(line.strip())
-                    data = ['' if i == ' ' else i for i in data]
-                    bulk_row_insert.append(map_mapping_types(data, sorted_col_mappings, row_num=row_counter, source_filename=import_file, header=source_fileheader, header_values=header_values))
-                    row_counter += 1
-                logs.info('Bulk inserting rows %d-%d' % (row_counter_start, row_counter-1))
+                pos = quote + 2
+        pos = quote + 1
+
+def iter_line_ranges(mm, start, range_bytes, delimiter=None):
+    """
+    Split the memory-mapped file `mm` from `start` into (start, end) byte ranges of whole records, about `range_bytes`
+    each. `delimiter` is the delimiter of a csv file, whose quoted fields may hold newlines.
+    """
+    size = len(mm)
+    while start < size:
+        end = next_line_start(mm, start, min(start + range_bytes, size), delimiter)
+        yield start, end
+        start = end
+
+def read_header_line(import_file, source_reader, delimiter):
+    """
+    Returns the values of the header row of the delimited `import_file` and the offset of the line after it.
+    """
+    if not os.path.getsize(import_file):
+        return [], 0
+    with open(import_file, 'rb') as fp, mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        end = next_line_start(mm, 0, 0, delimiter if source_reader == 'csv' else None)
+        text = mm[:end].decode(locale.getpreferredencoding(False))
+    rows = [row for batch, _ in delimited_readers[source_reader](io.StringIO(text, newline=''), delimiter, end + 1) for row in batch]
+    return ['' if v is None else str(v) for v in (rows[0] if rows else [])], end
+
+def parse_shard(import_file, start, end, source_reader, delimiter, max_bytes_per_chunk, bind_mappings, header, header_values):
+    """
+    Parse and map the lines in bytes `start`-`end` of `import_file`, in a `--parse-processes` process.
+    Rows are numbered from 1 within the range. Returns the batches of bind rows and the parse and map times.
+    """
+    started = time.time()
+    with open(import_file, 'rb') as fp, mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        text = mm[start:end].decode(locale.getpreferredencoding(False))
+    batches = [rows for rows, _ in delimited_readers[source_reader](io.StringIO(text, newline=''), delimiter, max_bytes_per_chunk)]
+    parsed = time.time()
+    key = (import_file, repr(bind_mappings), header, tuple(header_values or ()))
+    if key not in shard_row_mappers:
+        shard_row_mappers[key] = compile_row_mapper(bind_mappings, source_filename=import_file, header=header, header_values=header_values)
+    map_row = shard_row_mappers[key]
+    row_num = 1
+    mapped = []
+    for rows in batches:
+        mapped.append([map_row(row, n) for n, row in enumerate(rows, row_num)])
+        row_num += len(rows)
+    return mapped, parsed - started, time.time() - parsed
+
+def compile_row_renumber(mapping_list):
+    """
+    Returns a function `renumber(rows, base)` adding `base` to the S-ROWNUM values of bind rows, or None
+    when no column is mapped from S-ROWNUM.
+    """
+    positions = [n for n, (_, elem) in enumerate(mapping_list) if elem.get('Type') == 'S-ROWNUM']
+    if not positions:
+        return None
+    values = ['row[%d] + base' % n if n in positions else 'row[%d]' % n for n in range(len(mapping_list))]
+    namespace = {}
+    exec('def renumber(rows, base):\n    return [(%s) for row in rows]\n' % ''.join(['%s, ' % v for v in values]), namespace)
+    return namespace['renumber']
+
+def get_parse_executor(options):
+    global parse_executor
+    if parse_executor is None:
+        parse_executor = ProcessPoolExecutor(max_workers=options.parse_processes, initializer=set_options, initargs=(options, script_execution_time))
+    return parse_executor
+
+def sharded_chunks(import_file, start, first_row, source_reader, delimiter, max_bytes_per_chunk, bind_mappings, header, header_values, options, skip_row=None, stats=None):
+    """
+    Parse and map the delimited `import_file` from byte `start` in the `--parse-processes` processes of `options`. The file is
+    memory-mapped and split into ranges of whole lines, respecting quoted newlines with the csv reader. A few ranges
+    per process are parsed ahead. Yields the chunks of `map_chunks`, in file order and numbered from `first_row`.
+    The last chunk of every range carries the offset of its end.
+    """
+    if start >= os.path.getsize(import_file):
+        return
+    executor = get_parse_executor(options)
+    renumber = compile_row_renumber(bind_mappings)
+    pending = deque()
+    row_counter = first_row
+    with open(import_file, 'rb') as fp, mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        ranges = iter_line_ranges(mm, start, max_bytes_per_chunk * chunks_per_shard, delimiter if source_reader == 'csv' else None)
+        while True:
+            while len(pending) < 2 * options.parse_processes:
+                line_range = next(ranges, None)
+                if line_range is None:
+                    break
+                pending.append((line_range, executor.submit(parse_shard, import_file, line_range[0], line_range[1], source_reader, delimiter,
+                                                            max_bytes_per_chunk, bind_mappings, header, header_values)))
+            if not pending:
+                return
+            (range_start, range_end), future = pending.popleft()
+            batches, parse_seconds, map_seconds = future.result()
+            rows = sum([len(batch) for batch in batches])
+            record_stage(stats, 'read', parse_seconds, rows, range_end - range_start)
+            record_stage(stats, 'map', map_seconds, rows)
+            logs.info('Parsed bytes %d-%d of input file - %d row(s)' % (range_start, range_end, rows))
+            # The rows of the range were numbered from 1.
+            base = row_counter - 1
+            for n, batch in enumerate(batches):
+                if renumber:
+                    batch = renumber(batch, base)
+                offset = range_end if n == len(batches) - 1 else None
+                row_counter_start = row_counter
+                if skip_row:
+                    bulk_row_insert = []
+                    for bind_row in batch:
+                        if skip_row(row_counter):
+                            if bulk_row_insert:
+                                yield row_counter_start, row_counter-1, bulk_row_insert, None
+                                bulk_row_insert = []
+                            row_counter += 1
+                            row_counter_start = row_counter
+                            continue
+                        bulk_row_insert.append(bind_row)
+                        row_counter += 1
+                    batch = bulk_row_insert
+                else:
+                    row_counter += len(batch)
+                if batch:
+                    yield row_counter_start, row_counter-1, batch, offset
+
+def read_batching_settings(descriptor_file_data, options):
+    """
+    Returns the adaptive batching state of an import, or None when chunks are sized by `MaxBytesPerChunk` alone.
+    Adaptive batching is enabled by an `AdaptiveBatching` object in the descriptor file or by `--adaptive-batches`.
+    """
+    settings = descriptor_file_data.get('AdaptiveBatching')
+    if settings is None and not options.adaptive_batches:
+        return None
+    settings = settings or {}
+    min_rows = int(settings.get('MinRows', 100))
+    max_rows = int(settings.get('MaxRows', 50000))
+    return {
+        'rows': min(max(int(settings.get('InitialRows', 1000)), min_rows), max_rows),
+        'min_rows': min_rows,
+        'max_rows': max_rows,
+        'max_bytes': int(settings.get('MaxBytes', 32 * 1024 * 1024)),
+        'target_seconds': float(settings.get('TargetSeconds', 1.0)),
+        'row_bytes': None,
+        'best_rows': None,
+        'best_throughput': 0.0,
+        'lock': threading.Lock()
+    }
+
+def batch_row_limit(batching):
+    """
+    Current chunk size in rows, capped so a chunk stays within `MaxBytes` at the measured row width.
+    """
+    rows = batching['rows']
+    if batching['row_bytes']:
+        rows = min(rows, max(batching['max_bytes'] // batching['row_bytes'], 1))
+    return rows
+
+def adaptive_chunks(chunks, batching):
+    """
+    Regroup the chunks of `map_chunks` into chunks of `batch_row_limit` rows. Chunks that are not contiguous,
+    around rows skipped on resume, are never merged. A regrouped chunk keeps the file offset of the chunk it
+    ends with only when it ends at the end of that chunk.
+    """
+    rows = []
+    row_start = row_end = None
+    rows_offset = None
+    for chunk_start, chunk_end, chunk_rows, offset in chunks:
+        if rows and chunk_start != row_end + 1:
+            yield row_start, row_end, rows, rows_offset
+            rows = []
+        if not rows:
+            row_start = chunk_start
+        row_bytes = sum([len(str(v)) + 1 for v in chunk_rows[0]])
+        batching['row_bytes'] = row_bytes if not batching['row_bytes'] else (batching['row_bytes'] * 3 + row_bytes) // 4
+        rows.extend(chunk_rows)
+        row_end = chunk_end
+        rows_offset = offset
+        size = batch_row_limit(batching)
+        while len(rows) >= size:
+            yield row_start, row_start + size - 1, rows[:size], rows_offset if size == len(rows) else None
+            rows = rows[size:]
+            row_start += size
+            size = batch_row_limit(batching)
+    if rows:
+        yield row_start, row_end, rows, rows_offset
+
+def record_batch_timing(batching, row_count, seconds):
+    """
+    Resize the next chunks from the insert and commit latency of the last one. The size moves towards the
+    number of rows the measured throughput loads in `TargetSeconds`, at most doubling or halving at a time,
+    and falls back to the best size seen when growing made the throughput drop.
+    """
+    with batching['lock']:
+        size = batching['rows']
+        throughput = row_count / max(seconds, 0.001)
+        if row_count < batch_row_limit(batching):
+            # Short chunks at the end of a file or around skipped rows say little about the batch size.
+            return
+        if seconds > batching['target_seconds'] * 1.5:
+            new_size = size // 2
+        else:
+            new_size = min(max(int(throughput * batching['target_seconds']), size // 2), size * 2)
+            if batching['best_rows'] and size > batching['best_rows'] and throughput < batching['best_throughput'] * 0.8:
+                new_size = batching['best_rows']
+        if throughput > batching['best_throughput']:
+            batching['best_rows'], batching['best_throughput'] = size, throughput
+        new_size = min(max(new_size, batching['min_rows']), batching['max_rows'])
+        # Changes of less than 10% are noise and would only churn the log.
+        if abs(new_size - size) > size // 10:
+            logs.info('Batch size %d -> %d rows (%d rows inserted in %.3fs, %.0f rows/s)' % (size, new_size, row_count, seconds, throughput))
+            batching['rows'] = new_size
+
+def checkpoint_path(import_file, checkpoint_dir):
+    abs_path = os.path.abspath(import_file)
+    return os.path.join(checkpoint_dir, '%s-%s.json' % (os.path.basename(abs_path), hashlib.sha1(abs_path.encode()).hexdigest()[:10]))
+
+def load_checkpoint(import_file, checkpoint_dir):
+    """
+    Returns the checkpoint of `import_file` kept in `checkpoint_dir`. A checkpoint of a file whose size
+    or modification time changed since is discarded.
+    `row` is the last row committed with all the rows before it, `offset` the file position right after row
+    `offset_row` and `committed` the row ranges committed past `row`.
+    """
+    stat = os.stat(import_file)
+    checkpoint = {
+        'file': os.path.abspath(import_file),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'row': 0,
+        'offset': None,
+        'offset_row': 0,
+        'committed': [],
+        'complete': False
+    }
+    path = checkpoint_path(import_file, checkpoint_dir)
+    if os.path.exists(path):
+        with open(path, 'r') as fp:
+            saved = json.load(fp)
+        if saved['size'] == stat.st_size and saved['mtime'] == stat.st_mtime:
+            return saved
+        logs.info('%s changed since checkpoint %s, loading it from the start' % (import_file, path))
+    return checkpoint
+
+def save_checkpoint(checkpoint, checkpoint_dir):
+    path = checkpoint_path(checkpoint['file'], checkpoint_dir)
+    with open(path + '.tmp', 'w') as fp:
+        json.dump(checkpoint, fp)
+    os.replace(path + '.tmp', path)
+
+def record_checkpoint(load_state, row_start, row_end, offset):
+    """
+    Record rows `row_start`-`row_end` as committed. Chunks may commit out of order with `--inserters`,
+    the checkpoint only advances `row` once every row before a chunk is committed.
+    """
+    checkpoint = load_state['checkpoint']
+    if not checkpoint:
+        return
+    with load_state['lock']:
+        pending = load_state['pending']
+        pending[row_start] = (row_end, offset)
+        while checkpoint['row'] + 1 in pending:
+            row_end, offset = pending.pop(checkpoint['row'] + 1)
+            checkpoint['row'] = row_end
+            if offset is not None:
+                checkpoint['offset'], checkpoint['offset_row'] = offset, row_end
+        checkpoint['committed'] = sorted([[k, v[0]] for k, v in pending.items()])
+        save_checkpoint(checkpoint, load_state['options'].checkpoint_dir)
+
+def write_rejects(load_state, row_start, rows, batch_errors):
+    """
+    Append the rows rejected by the database or on the client to the reject file of the source file, with their row and line numbers.
+    """
+    with load_state['lock']:
+        if not load_state['reject_writer']:
+            logs.info('Writing rejected rows to %s' % load_state['reject_file_name'])
+            load_state['reject_file'] = open(load_state['reject_file_name'], 'a', newline='')
+            load_state['reject_writer'] = csv.writer(load_state['reject_file'])
+            load_state['reject_writer'].writerow(['ROW', 'LINE', 'ERROR'] + load_state['reject_columns'])
+        # Incremental chunks only hold the new and changed rows of their row range.
+        row_numbers = load_state['row_numbers'].get(row_start)
+        for error in batch_errors:
+            row_num = row_numbers[error.offset] if row_numbers else row_start + error.offset
+            logs.error('Row %d rejected - %s' % (row_num, error.message))
+            load_state['reject_writer'].writerow([row_num, row_num + load_state['header_lines'], error.message] + list(rows[error.offset]))
+        load_state['reject_file'].flush()
+
+def chunk_result(chunk, load_state, error=None):
+    """
+    Returns the result dict of inserting `chunk`. Rows of its range an incremental load left out count as
+    'unchanged', rows `delta_chunks` or `convert_chunks` rejected on the client as 'rejected'.
+    """
+    row_start, row_end, rows, _ = chunk
+    rejected = load_state['client_rejects'].get(row_start, 0)
+    return {'row_start': row_start, 'row_end': row_end, 'rejected': rejected,
+            'unchanged': row_end - row_start + 1 - len(rows) - rejected, 'error': error}
+
+def insert_chunk(connection, insert_sql, chunk, load_state, uncommitted=None):
+    """
+    Insert one chunk and write its rejected rows. The chunk is committed, and its checkpoint recorded, once the
+    chunks in `uncommitted` since the last commit of the session hold `CommitRows` rows. Returns the chunk result dict.
+    Any error sending the chunk only fails this chunk, errors recording committed chunks are raised.
+    """
+    row_start, row_end, rows, offset = chunk
+    logs.info('Bulk inserting rows %d-%d' % (row_start, row_end))
+    result = chunk_result(chunk, load_state)
+    uncommitted = [] if uncommitted is None else uncommitted
+    started = time.time()
+    try:
+        # An incremental chunk may have no new or changed row left, it is only committed for its checkpoint.
+        batch_errors = executemany_sql(connection, insert_sql, rows, commit=False, input_sizes=load_state['input_sizes'],
+                                       batcherrors=not load_state['options'].reload) if rows else []
+    except Exception as e:
+        result['error'] = str(e)
+        record_delta(load_state, row_start, False)
+        forget_chunk(load_state, row_start)
+        return result
+    finally:
+        record_stage(load_state['stats'], 'execute', time.time() - started, len(rows))
+        logs.debug('Rows %d-%d executed in %.3fs' % (row_start, row_end, time.time() - started))
+    if batch_errors:
+        result['rejected'] += len(batch_errors)
+        write_rejects(load_state, row_start, rows, batch_errors)
+        if load_state['delta']:
+            # Rejected rows are not in the table, the next load sends them again.
+            entries = load_state['delta']['pending'][row_start]
+            for error in batch_errors:
+                entries[error.offset] = None
+    forget_chunk(load_state, row_start)
+    uncommitted.append((result, offset))
+    if sum([x['row_end'] - x['row_start'] + 1 for x, _ in uncommitted]) >= load_state['commit_rows']:
+        commit_chunks(connection, load_state, uncommitted)
+    if load_state['batching']:
+        record_batch_timing(load_state['batching'], len(rows), time.time() - started)
+    return result
+
+def forget_chunk(load_state, row_start):
+    """
+    Drop the row numbers and client-side reject count kept for the chunk starting at `row_start` once it was sent.
+    """
+    load_state['row_numbers'].pop(row_start, None)
+    load_state['client_rejects'].pop(row_start, None)
+
+def commit_chunks(connection, load_state, uncommitted):
+    """
+    Commit the chunks inserted on `connection` since its last commit and record their checkpoints.
+    If the commit fails every one of those chunks is marked as failed.
+    """
+    if not uncommitted:
+        return
+    started = time.time()
+    try:
+        connection.commit()
+    except Exception as e:
+        logs.error('Commit of rows %d-%d failed - %s' % (uncommitted[0][0]['row_start'], uncommitted[-1][0]['row_end'], e))
+        for result, offset in uncommitted:
+            result['error'] = str(e)
+            record_delta(load_state, result['row_start'], False)
+    else:
+        record_stage(load_state['stats'], 'commit', time.time() - started,
+                     sum([x['row_end'] - x['row_start'] + 1 for x, _ in uncommitted]))
+        for result, offset in uncommitted:
+            record_checkpoint(load_state, result['row_start'], result['row_end'], offset)
+            record_delta(load_state, result['row_start'], True)
+    del uncommitted[:]
+
+def insert_chunks(connection, insert_sql, chunks, load_state):
+    """
+    Insert and commit `chunks` one after another on `connection`. Returns one result dict per chunk.
+    """
+    uncommitted = []
+    results = [insert_chunk(connection, insert_sql, chunk, load_state, uncommitted) for chunk in chunks]
+    commit_chunks(connection, load_state, uncommitted)
+    return results
+
+def pipeline_insert_chunks(pool, insert_sql, chunks, inserters, load_state):
+    """
+    Insert `chunks` with `inserters` threads each holding a session from `pool`, while the calling thread
+    keeps reading and mapping. The bounded queue between them blocks the reader when the inserters fall behind.
+    Returns one result dict per chunk, in no particular order. Errors `insert_chunk` raises are raised again
+    once every inserter stopped, as `insert_chunks` raises them.
+    """
+    chunk_queue = queue.Queue(maxsize=inserters * 2)
+    results = []
+    errors = []
+
+    def inserter():
+        session = None
+        acquire_error = None
+        uncommitted = []
+        try:
+            session = pool.acquire()
+        except Exception as e:
+            acquire_error = str(e)
+        while True:
+            chunk = chunk_queue.get()
+            if chunk is None:
+                break
+            if session and not errors:
                 try:
-                    executemany_sql(connection, db_table, [x['Target'] for x in sorted_col_mappings], bulk_row_insert)
-                except cx_Oracle.DatabaseError as e:
-                    pass
+                    results.append(insert_chunk(session, insert_sql, chunk, load_state, uncommitted))
+                    continue
+                except Exception as e:
+                    # Keep draining the queue so the reading thread never blocks on a dead inserter.
+                    errors.append(e)
+            results.append(chunk_result(chunk, load_state, acquire_error or 'Not inserted after an earlier error'))
+            record_delta(load_state, chunk[0], False)
+            forget_chunk(load_state, chunk[0])
+        if session:
+            try:
+                commit_chunks(session, load_state, uncommitted)
+            except Exception as e:
+                errors.append(e)
+            pool.release(session)
+
+    threads = [threading.Thread(target=inserter, name='inserter-%d' % i) for i in range(inserters)]
+    for thread in threads:
+        thread.start()
+    try:
+        for chunk in chunks:
+            chunk_queue.put(chunk)
+    finally:
+        for thread in threads:
+            chunk_queue.put(None)
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
+def report_chunk_results(results):
+    """
+    Log failed chunks ordered by row range. Returns the number of rows loaded and failed.
+    Rows an incremental load left out as unchanged count as neither.
+    """
+    rows_loaded = 0
+    rows_failed = 0
+    for result in sorted(results, key=lambda k: k['row_start']):
+        row_count = result['row_end'] - result['row_start'] + 1 - result['unchanged']
+        if result['error']:
+            logs.error('Rows %d-%d were not loaded - %s' % (result['row_start'], result['row_end'], result['error']))
+            rows_failed += row_count
+        else:
+            rows_loaded += row_count - result['rejected']
+            rows_failed += result['rejected']
+    return rows_loaded, rows_failed
+
+def delta_index_file(target_info, delta_dir):
+    """
+    Returns the row-hash index of the target table of `target_info` in `delta_dir`.
+    """
+    return os.path.join(delta_dir, '%s-%s-%s.%s.sqlite' % (
+        target_info['DBServer'], target_info['DBService'], target_info['Schema'], target_info['TableName']))
+
+def open_delta_index(filename):
+    index = sqlite3.connect(filename, timeout=60, check_same_thread=False)
+    # The index can be rebuilt by a full load, a crash may lose its last commits but must not corrupt it.
+    index.execute('PRAGMA journal_mode=WAL')
+    index.execute('PRAGMA synchronous=NORMAL')
+    index.execute('CREATE TABLE IF NOT EXISTS row_hashes (key BLOB PRIMARY KEY, row_hash BLOB NOT NULL, '
+                  'key_values TEXT NOT NULL, run TEXT NOT NULL) WITHOUT ROWID')
+    index.commit()
+    return index
+
+def read_delta_settings(descriptor_file_data, bind_mappings, delta_run, delta_dir):
+    """
+    Returns the incremental load state of a source file: the row-hash index of its target table and the positions
+    of the key columns and of the hashed columns in the bind rows. The hash covers every bound column but
+    S-ROWNUM and S-FILENAME, which tell where a row was read rather than what it holds.
+    """
+    key_columns = descriptor_file_data['Incremental']['KeyColumns']
+    targets = [elem['Target'] for _, elem in bind_mappings]
+    unmapped = [x for x in key_columns if x not in targets]
+    if unmapped:
+        raise ValueError('Incremental.KeyColumns %s are not mapped from the source file' % ', '.join(unmapped))
+    os.makedirs(delta_dir, exist_ok=True)
+    return {
+        'index': open_delta_index(delta_index_file(descriptor_file_data['TargetInfo'], delta_dir)),
+        'lock': threading.Lock(),
+        'key_positions': [targets.index(x) for x in key_columns],
+        'hash_positions': [n for n, (_, elem) in enumerate(bind_mappings)
+                           if elem['Type'] != 'S-ROWNUM' and not elem['Type'].startswith('S-FILENAME')],
+        'run': delta_run,
+        'pending': {},
+        # Keys of the chunks sent but not yet committed or failed, and the keys of every such chunk.
+        'in_flight': set(),
+        'chunk_keys': {},
+        'new': 0,
+        'changed': 0,
+        'unchanged': 0
+    }
+
+def row_digest(row, positions):
+    return hashlib.blake2b('\x1f'.join(['' if row[i] is None else str(row[i]) for i in positions]).encode(), digest_size=16).digest()
+
+def delta_chunks(chunks, load_state):
+    """
+    Leave the rows the row-hash index already holds with the same hash out of `chunks`, and regroup the new and
+    changed rows into chunks as large as the incoming ones. A regrouped chunk covers the row range of every chunk
+    it was built from. Its row numbers are kept in load_state['row_numbers'] for the reject file, and the hashes of
+    its rows wait in the delta 'pending' dict until `record_delta` sees the chunk committed.
+    Every key already in the index is marked as seen by this run right away, whether its row loads or not.
+    A row whose key an earlier row of the run already held is rejected as a duplicate.
+    """
+    delta = load_state['delta']
+    index = delta['index']
+    key_positions = delta['key_positions']
+    hash_positions = delta['hash_positions']
+    rows = []
+    row_numbers = []
+    entries = []
+    row_start = row_end = offset = None
+    max_rows = 0
+
+    def regrouped_chunk():
+        load_state['row_numbers'][row_start] = row_numbers
+        delta['pending'][row_start] = entries
+        delta['chunk_keys'][row_start] = [entry[0] for entry in entries]
+        return row_start, row_end, rows, offset
+
+    for chunk_start, chunk_end, chunk_rows, chunk_offset in chunks:
+        if row_start is not None and chunk_start != row_end + 1:
+            yield regrouped_chunk()
+            rows, row_numbers, entries = [], [], []
+            row_start = None
+        started = time.time()
+        keys = [row_digest(row, key_positions) for row in chunk_rows]
+        hashes = [row_digest(row, hash_positions) for row in chunk_rows]
+        known = {}
+        with delta['lock']:
+            # SQLite allows 999 bind variables per statement before 3.32.
+            for n in range(0, len(keys), 500):
+                batch = keys[n:n + 500]
+                found = index.execute('SELECT key, row_hash, run FROM row_hashes WHERE key IN (%s)' % ','.join('?' * len(batch)), batch).fetchall()
+                if found:
+                    index.execute('UPDATE row_hashes SET run = ? WHERE key IN (%s)' % ','.join('?' * len(found)), [delta['run']] + [x[0] for x in found])
+                    known.update([(key, (row_hash, run)) for key, row_hash, run in found])
+            index.commit()
+            # Keys this run already marked or stored, sent in a chunk not committed yet, or earlier in this chunk.
+            seen = set([key for key, (_, run) in known.items() if run == delta['run']]) | delta['in_flight']
+            duplicates = []
+            for n, key in enumerate(keys):
+                if key in seen:
+                    duplicates.append(RejectedRow(n, 'Duplicate Incremental.KeyColumns of an earlier row of the run'))
+                seen.add(key)
+        if row_start is None:
+            row_start = chunk_start
+        if duplicates:
+            write_rejects(load_state, chunk_start, chunk_rows, duplicates)
+            load_state['client_rejects'][row_start] = load_state['client_rejects'].get(row_start, 0) + len(duplicates)
+        duplicate_offsets = set([x.offset for x in duplicates])
+        rows_before = len(rows)
+        for n, (row, key, row_hash) in enumerate(zip(chunk_rows, keys, hashes)):
+            previous = known.get(key, (None, None))[0]
+            if n in duplicate_offsets or previous == row_hash:
+                continue
+            delta['changed' if previous else 'new'] += 1
+            rows.append(row)
+            row_numbers.append(chunk_start + n)
+            entries.append((key, row_hash, json.dumps([row[i] for i in key_positions], default=str)))
+        delta['unchanged'] += len(chunk_rows) - len(duplicates) - len(rows) + rows_before
+        with delta['lock']:
+            delta['in_flight'].update([entry[0] for entry in entries[rows_before:]])
+        row_end = chunk_end
+        offset = chunk_offset
+        max_rows = max(max_rows, len(chunk_rows))
+        record_stage(load_state['stats'], 'delta', time.time() - started, len(chunk_rows))
+        if len(rows) >= max_rows:
+            yield regrouped_chunk()
+            rows, row_numbers, entries = [], [], []
+            row_start = None
+    if row_start is not None:
+        yield regrouped_chunk()
+
+def record_delta(load_state, row_start, committed):
+    """
+    Store the row hashes of the incremental chunk starting at `row_start` in the row-hash index once the chunk
+    is `committed`, or forget them when it failed so the next load sends its rows again.
+    """
+    delta = load_state['delta']
+    if not delta:
+        return
+    with delta['lock']:
+        entries = delta['pending'].pop(row_start, None)
+        delta['in_flight'].difference_update(delta['chunk_keys'].pop(row_start, []))
+        if committed and entries:
+            delta['index'].executemany('INSERT OR REPLACE INTO row_hashes VALUES (?, ?, ?, ?)',
+                                       [entry + (delta['run'],) for entry in entries if entry])
+            delta['index'].commit()
+
+def report_deleted_keys(descriptor_file_data, delta_run, summaries, delta_dir):
+    """
+    Write the keys of the row-hash index in `delta_dir` that no source file of the incremental run `delta_run` held to a
+    `<schema>.<table>-deleted-<delta_run>.csv` file and drop them from the index. The table itself is left as is.
+    Only a run that read every one of its files in full can tell which keys are gone.
+    Returns the number of deleted keys.
+    """
+    incomplete = [x for x in summaries if x['error'] or x.get('resumed') or x.get('skipped')]
+    if incomplete:
+        logs.warning('%d file(s) were not read in full, deleted keys are not reported' % len(incomplete))
+        return 0
+    target_info = descriptor_file_data['TargetInfo']
+    index = open_delta_index(delta_index_file(target_info, delta_dir))
+    try:
+        rows = index.execute('SELECT key_values FROM row_hashes WHERE run != ?', (delta_run,)).fetchall()
+        if rows:
+            # The run id holds the microseconds and process id, runs never overwrite each other's report.
+            filename = '{schema}.{table}-deleted-{run}.csv'.format(
+                schema=target_info['Schema'], table=target_info['TableName'], run=delta_run)
+            logs.warning('%d key(s) of %s.%s are no longer in the source files, writing them to %s' % (
+                len(rows), target_info['Schema'], target_info['TableName'], filename))
+            with open(filename, 'w', newline='') as fp:
+                writer = csv.writer(fp)
+                writer.writerow(descriptor_file_data['Incremental']['KeyColumns'])
+                writer.writerows([json.loads(row[0]) for row in rows])
+            index.execute('DELETE FROM row_hashes WHERE run != ?', (delta_run,))
+            index.commit()
+    finally:
+        index.close()
+    return len(rows)
+
+def import_source_file(descriptor_file_data, import_file, connection=None, delta_run=None, load_time=None, options=None):
+    """
+    Import a single source file matched by `SourceInfo.Location` and return a summary dict with the rows
+    loaded and failed. When `connection` is not provided the session of the current worker process is used.
+    `delta_run` identifies the incremental run of `--delta-dir` the file belongs to, `load_time` is the value of
+    its S-datetime.now() columns. `options` are the options returned by `parse_args`, the configured ones by default.
+    """
+    options = options or args
+    target_info = descriptor_file_data['TargetInfo']
+    source_info = descriptor_file_data['SourceInfo']
+    db_table = target_info.get('TableName')
+    source_delimeter = source_info.get('Delimiter', ',')
+    source_reader = source_info.get('Reader', 'csv').lower()
+    source_filetype = source_info['FileType']
+    source_fileheader = True if source_info['FileHeader'].lower() == 'yes' else False
+    MAX_BYTES_PER_CHUNK = descriptor_file_data['MaxBytesPerChunk']
+    db_info = (target_info['DBServer'], int(target_info['DBPort']), target_info['UserName'],
+               target_info['PassWord'], target_info['DBService'], target_info.get('DBEncoding', 'UTF-8'))
+
+    summary = {'file': import_file, 'rows_loaded': 0, 'rows_failed': 0, 'error': None,
+               'bytes': os.path.getsize(import_file), 'seconds': 0.0, 'stages': {}}
+    started = time.time()
+    logs.info("Processing %s" % import_file)
+    log_file_name = '{filename}-{date:%Y-%m-%d_%H-%M-%S}'.format(
+        filename=os.path.basename(import_file).split('.')[0],
+        date=datetime.datetime.now() if options.watch else script_execution_time
+    )
+    set_error_log_handler(log_file_name)
+    load_state = {
+        'checkpoint': None,
+        'pending': {},
+        'lock': threading.Lock(),
+        'reject_file_name': '%s-rejects.csv' % log_file_name,
+        'reject_file': None,
+        'reject_writer': None,
+        'header_lines': 1 if source_fileheader else 0,
+        'batching': read_batching_settings(descriptor_file_data, options),
+        # A direct-path insert has to be committed before the session can touch the table again.
+        'commit_rows': 0 if options.reload else int(descriptor_file_data.get('CommitRows', 0)),
+        'stats': summary['stages'],
+        'delta': None,
+        'row_numbers': {},
+        'convert_row': None,
+        'input_sizes': None,
+        'client_rejects': {},
+        'options': options
+    }
+    f = None
+    rows = None
+    try:
+        skip_row = None
+        if options.checkpoint_dir:
+            checkpoint = load_checkpoint(import_file, options.checkpoint_dir)
+            if checkpoint['complete']:
+                logs.info('%s was fully loaded by a previous run, skipping it' % import_file)
+                summary['skipped'] = True
+                return summary
+            if checkpoint['row'] or checkpoint['committed']:
+                logs.info('Resuming %s after row %d' % (import_file, checkpoint['row']))
+                summary['resumed'] = True
+                resume_row = checkpoint['row']
+                committed = list(checkpoint['committed'])
+                skip_row = lambda n: n <= resume_row or any([start <= n <= end for start, end in committed])
+            load_state['checkpoint'] = checkpoint
+            load_state['pending'] = dict([(start, (end, None)) for start, end in checkpoint['committed']])
+            # Fails on an unwritable --checkpoint-dir before a chunk commits rows no checkpoint records.
+            save_checkpoint(checkpoint, options.checkpoint_dir)
+
+        sorted_col_mappings = sorted(descriptor_file_data['ColMappings'], key=lambda k: int(k.get('Order') or sys.maxsize))
+        insert_sql, bind_mappings = build_insert_sql(db_table, sorted_col_mappings, direct_path=bool(options.reload), load_time=load_time)
+        load_state['reject_columns'] = [elem['Target'] for _, elem in bind_mappings]
+        load_state['convert_row'], load_state['input_sizes'] = compile_row_converter(bind_mappings)
+        if options.delta_dir:
+            load_state['delta'] = read_delta_settings(descriptor_file_data, bind_mappings, delta_run or '%s-%d' % (time.time(), os.getpid()), options.delta_dir)
+            insert_sql, bind_mappings = build_merge_sql(db_table, sorted_col_mappings, descriptor_file_data['Incremental']['KeyColumns'], load_time)
+
+        checkpoint_offset = load_state['checkpoint']['offset'] if load_state['checkpoint'] else None
+        if source_filetype != 'xlsx' and options.parse_processes > 1:
+            logs.info('Parsing %s in %d processes' % (import_file, options.parse_processes))
+            header_values, read_offset = read_header_line(import_file, source_reader, source_delimeter) if source_fileheader else (None, 0)
+            first_row = 1
+            if checkpoint_offset is not None:
+                first_row = load_state['checkpoint']['offset_row'] + 1
+                read_offset = checkpoint_offset
+            chunks = sharded_chunks(import_file, read_offset, first_row, source_reader, source_delimeter, MAX_BYTES_PER_CHUNK,
+                                    bind_mappings, source_fileheader, header_values, options, skip_row=skip_row, stats=load_state['stats'])
+        else:
+            if source_filetype == 'xlsx':
+                logs.info('Streaming rows from %s' % import_file)
+                rows = iter_xlsx_rows(import_file)
+                batches = batch_rows(rows, MAX_BYTES_PER_CHUNK)
+            else:
+                f = open(import_file, 'r', newline='')
+                batches = delimited_readers[source_reader](f, source_delimeter, MAX_BYTES_PER_CHUNK)
+
+            header_values = None
+            first_row = 1
+            read_offset = 0 if f else None
+            if source_fileheader:
+                first_batch, first_offset = next(batches, ([], None))
+                header_values = ['' if v is None else str(v) for v in (first_batch.pop(0) if first_batch else [])]
+                batches = itertools.chain([(first_batch, first_offset)], batches)
+            if f and checkpoint_offset is not None:
+                # Jump straight to the last checkpointed position instead of reading the committed rows again.
+                f.seek(checkpoint_offset)
+                batches = delimited_readers[source_reader](f, source_delimeter, MAX_BYTES_PER_CHUNK)
+                first_row = load_state['checkpoint']['offset_row'] + 1
+                read_offset = checkpoint_offset
+            batches = timed_batches(batches, load_state['stats'], read_offset)
+            map_row = compile_row_mapper(bind_mappings, source_filename=import_file, header=source_fileheader, header_values=header_values)
+            chunks = map_chunks(batches, map_row, MAX_BYTES_PER_CHUNK, first_row=first_row, skip_row=skip_row, stats=load_state['stats'])
+        if load_state['batching']:
+            chunks = adaptive_chunks(chunks, load_state['batching'])
+        if load_state['delta']:
+            chunks = delta_chunks(chunks, load_state)
+        if load_state['convert_row']:
+            chunks = convert_chunks(chunks, load_state)
+        if options.inserters:
+            pool = get_session_pool(*db_info, size=options.inserters)
+            chunk_results = pipeline_insert_chunks(pool, insert_sql, chunks, options.inserters, load_state)
+        else:
+            if not connection:
+                connection = get_db_connection(*db_info)
+            chunk_results = insert_chunks(connection, insert_sql, chunks, load_state)
+        summary['rows_loaded'], summary['rows_failed'] = report_chunk_results(chunk_results)
+        summary['chunks_failed'] = len([x for x in chunk_results if x['error']])
+        if load_state['batching']:
+            summary['batch_rows'] = batch_row_limit(load_state['batching'])
+            logs.info('Batch size for %s settled at %d rows, best throughput %.0f rows/s at %s rows' % (
+                import_file, summary['batch_rows'], load_state['batching']['best_throughput'], load_state['batching']['best_rows']))
+        if load_state['checkpoint'] and not [x for x in chunk_results if x['error']]:
+            load_state['checkpoint']['complete'] = True
+            save_checkpoint(load_state['checkpoint'], options.checkpoint_dir)
+    except Exception as e:
+        logs.exception('Failed to import %s' % import_file)
+        summary['error'] = str(e)
+    finally:
+        if rows:
+            rows.close()
+        if f:
+            f.close()
+        if load_state['reject_file']:
+            load_state['reject_file'].close()
+        if load_state['delta']:
+            load_state['delta']['index'].close()
+            for key in ['new', 'changed', 'unchanged']:
+                summary['rows_%s' % key] = load_state['delta'][key]
+            logs.info('Delta of %s: %d new, %d changed and %d unchanged row(s)' % (
+                import_file, summary['rows_new'], summary['rows_changed'], summary['rows_unchanged']))
+        summary['seconds'] = time.time() - started
+        logs.info('Stages for %s: %s' % (import_file, format_stages(summary['stages'])))
+    return summary
+
+def log_import_summary(results):
+    """
+    Log the rows loaded and failed for every imported file. `results` may hold summaries
+    returned by `import_source_file` or futures of worker processes returning them.
+    """
+    summaries = [result.result() if isinstance(result, Future) else result for result in results]
+    if not summaries:
+        return summaries
+    logs.info('Import summary:')
+    for summary in summaries:
+        logs.info('  %s - %d row(s) loaded, %d row(s) failed%s%s%s' % (
+            summary['file'], summary['rows_loaded'], summary['rows_failed'],
+            ' - batch size %d rows' % summary['batch_rows'] if summary.get('batch_rows') else '',
+            ' - row count NOT verified' if summary.get('verified') is False else '',
+            ' - ERROR %s' % summary['error'] if summary['error'] else ''))
+    logs.info('Total: %d file(s), %d row(s) loaded, %d row(s) failed, %d file(s) with errors' % (
+        len(summaries),
+        sum([x['rows_loaded'] for x in summaries]),
+        sum([x['rows_failed'] for x in summaries]),
+        len([x for x in summaries if x['error']])))
+    return summaries
+
+def build_run_report(imports, exports, started=None, descriptors=()):
+    """
+    Returns the run report: the import and export summaries with the stage totals of the whole run,
+    or of the `--watch` poll that started at `started`. `descriptors` are the (descriptor file, descriptor data)
+    pairs of the run, whose target tables and files are listed in the report.
+    """
+    stages = {}
+    for summary in imports + exports:
+        merge_stages(stages, summary['stages'])
+    started = started or script_execution_time
+    finished = datetime.datetime.now()
+    return {
+        'started': started.isoformat(),
+        'finished': finished.isoformat(),
+        'seconds': (finished - started).total_seconds(),
+        'argv': sys.argv[1:],
+        'targets': sorted(set([data['TargetInfo'].get('TableName') or data['TargetInfo'].get('FileName') or desc_file
+                               for desc_file, data in descriptors])),
+        'rows_loaded': sum([x['rows_loaded'] for x in imports]),
+        'rows_failed': sum([x['rows_failed'] for x in imports]),
+        'rows_exported': sum([x['rows'] for x in exports]),
+        'files_with_errors': len([x for x in imports if x['error']]),
+        'files_not_verified': len([x for x in imports if x.get('verified') is False]),
+        'stages': stages,
+        'imports': imports,
+        'exports': exports
+    }
+
+def write_run_report(report, filename):
+    logs.info('Writing run report to %s' % filename)
+    with open(filename, 'w') as fp:
+        json.dump(report, fp, indent=2, default=str)
+
+# Run totals of the metrics file: report key, metric name and help text. Totals missing from a report are left out.
+run_metrics = [
+    ('rows_read', 'rows_read', 'Rows read from the source file during the last run.'),
+    ('rows_loaded', 'rows_loaded', 'Rows loaded during the last run.'),
+    ('rows_failed', 'rows_failed', 'Rows rejected or not loaded during the last run.'),
+    ('rows_exported', 'rows_exported', 'Rows exported during the last run.'),
+    ('files_with_errors', 'files_with_errors', 'Source files that failed to import during the last run.'),
+    ('files_not_verified', 'files_not_verified', 'Source files whose rows --verify did not find in the target table during the last run.'),
+    ('seconds', 'run_seconds', 'Duration of the last run.')
+]
+
+def write_metrics_file(report, filename, labels=None):
+    """
+    Write the run totals in the Prometheus text format, to be picked up by the node exporter textfile collector.
+    `labels` are added to every metric, so runs writing different files do not report the same series.
+    The file is replaced in one step so the collector never reads a partial file. Also used by import-oracle.py.
+    """
+    labels = labels or {}
+    def series(name, value, **extra):
+        label_pairs = ','.join(['%s="%s"' % (key, str(x).replace('\\', '\\\\').replace('"', '\\"'))
+                                for key, x in sorted(dict(labels, **extra).items())])
+        return 'import_oracle_%s%s %s' % (name, '{%s}' % label_pairs if label_pairs else '', value)
+    lines = []
+    for key, help_text in [('seconds', 'Time spent'), ('rows', 'Rows processed'), ('bytes', 'Bytes processed')]:
+        lines += ['# HELP import_oracle_stage_%s %s in each stage during the last run.' % (key, help_text),
+                  '# TYPE import_oracle_stage_%s gauge' % key]
+        lines += [series('stage_' + key, x[key], stage=stage) for stage, x in report['stages'].items()]
+    totals = [(name, report[key], help_text) for key, name, help_text in run_metrics if key in report]
+    for name, value, help_text in totals + [('last_run_timestamp_seconds', time.time(), 'Time the last run finished.')]:
+        lines += ['# HELP import_oracle_%s %s' % (name, help_text), '# TYPE import_oracle_%s gauge' % name, series(name, value)]
+    with open(filename + '.tmp', 'w') as fp:
+        fp.write('\n'.join(lines) + '\n')
+    os.replace(filename + '.tmp', filename)
+
+def stable_source_files(pattern, seen, settle_seconds):
+    """
+    Returns the files matching `pattern` whose size and modification time stayed the same over polls at least
+    `settle_seconds` apart, files still being written or copied are not complete yet.
+    `seen` keeps the last size and modification time of every file between polls and when they were first seen.
+    """
+    now = time.time()
+    ready = []
+    matched = set()
+    for filename in glob.glob(pattern):
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            # Moved away since the glob.
+            continue
+        if not os.path.isfile(filename):
+            continue
+        matched.add(filename)
+        state = (stat.st_size, stat.st_mtime)
+        if filename in seen and seen[filename][0] == state:
+            if now - seen[filename][1] >= settle_seconds:
+                ready.append(filename)
+        else:
+            seen[filename] = (state, now)
+    for filename in list(seen):
+        if filename not in matched:
+            del seen[filename]
+    return sorted(ready)
+
+def move_processed_file(summary, options):
+    """
+    Move an imported source file out of the watched glob, into `--processed-dir` or its `failed` subdirectory.
+    """
+    import_file = summary['file']
+    directory = options.processed_dir or os.path.join(os.path.dirname(import_file), 'processed')
+    if summary['error'] or summary.get('chunks_failed'):
+        directory = os.path.join(directory, 'failed')
+    os.makedirs(directory, exist_ok=True)
+    target = os.path.join(directory, os.path.basename(import_file))
+    if os.path.exists(target):
+        target = '{target}.{date:%Y-%m-%d_%H-%M-%S}'.format(target=target, date=datetime.datetime.now())
+    shutil.move(import_file, target)
+    if options.checkpoint_dir and os.path.exists(checkpoint_path(import_file, options.checkpoint_dir)):
+        os.remove(checkpoint_path(import_file, options.checkpoint_dir))
+    logs.info('Moved %s to %s' % (import_file, target))
+
+def watch_descriptors(descriptors, executor=None, options=None):
+    """
+    Import the new files of the import descriptors every `--watch` seconds until SIGTERM or SIGINT. The database
+    sessions, session pools and worker processes stay open between polls, so a new file only pays for its rows.
+    Every poll that imported files writes the run report and metrics file of that poll. `options` are the options
+    returned by `parse_args`, the configured ones by default.
+    """
+    options = options or args
+    stop = threading.Event()
+    def request_stop(signum, frame):
+        logs.info('Signal %d received, stopping after the current files' % signum)
+        stop.set()
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    watched = []
+    for desc_file, data in descriptors:
+        if 'DBServer' in data['TargetInfo'] and 'SourceInfo' in data:
+            watched.append((desc_file, data))
+        else:
+            logs.warning('--watch only imports source files, %s is skipped' % desc_file)
+    seen = dict([(desc_file, {}) for desc_file, _ in watched])
+    logs.info('Watching %s every %ss' % (', '.join([source_file_pattern(data) for _, data in watched]), options.watch))
+    while not stop.is_set():
+        started = datetime.datetime.now()
+        results = []
+        for desc_file, descriptor_file_data in watched:
+            import_files = stable_source_files(source_file_pattern(descriptor_file_data), seen[desc_file], options.settle_seconds)
+            if import_files and not stop.is_set():
+                results += process_import(desc_file, executor, descriptor_file_data, import_files, options)
+        summaries = log_import_summary(results)
+        for summary in summaries:
+            try:
+                move_processed_file(summary, options)
+            except OSError as e:
+                # It is imported again on the next poll unless it is moved by hand.
+                logs.error('Could not move %s - %s' % (summary['file'], e))
+        if summaries:
+            report = build_run_report(summaries, [], started, watched)
+            if options.report_file:
+                write_run_report(report, options.report_file)
+            if options.metrics_file:
+                write_metrics_file(report, options.metrics_file, {'target': ','.join(report['targets'])})
+        stop.wait(options.watch)
+
+def load_descriptor_files(json_file_path, options=None):
+    """
+    Parse and validate every descriptor matching `json_file_path` before any of them runs. Invalid
+    descriptors are logged and skipped. Returns (descriptor file, descriptor data) pairs.
+    """
+    descriptors = []
+    for desc_file in glob.glob(json_file_path):
+        try:
+            descriptors.append((desc_file, load_descriptor_file(desc_file, options)))
+        except (OSError, ValueError) as e:
+            logs.error('Skipping descriptor %s - %s' % (desc_file, e))
+    return descriptors
+
+def run(json_file_path, executor=None, options=None):
+    """
+    Run every descriptor matching `json_file_path` with the `options` returned by `parse_args`, the configured
+    ones by default, and return the run report. The database sessions stay open for the next run until
+    `close_db_connections`.
+    """
+    options = options or args
+    results = []
+    exports = []
+    descriptors = load_descriptor_files(json_file_path, options)
+    for desc_file, descriptor_file_data in descriptors:
+        desc_results, desc_exports = process_descriptor_file(desc_file, executor, descriptor_file_data, options)
+        results += desc_results
+        exports += desc_exports
+    return build_run_report(log_import_summary(results), exports, descriptors=descriptors)
+
+def main(argv=None):
+    try:
+        options = parse_args(argv)
+    except ValueError as e:
+        parser.error(str(e))
+    if not options.json_file_path:
+        parser.error("the following arguments are required: json_file_path")
+    logging.basicConfig(
+        format=log_format,
+        level=loglevel_mapping[options.loglevel],
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    executor = ProcessPoolExecutor(max_workers=options.workers, initializer=set_options, initargs=(options, script_execution_time)) if options.workers > 1 else None
+    try:
+        if options.watch:
+            watch_descriptors(load_descriptor_files(options.json_file_path, options), executor, options)
+        else:
+            report = run(options.json_file_path, executor, options)
+            if options.report_file:
+                write_run_report(report, options.report_file)
+            if options.metrics_file:
+                write_metrics_file(report, options.metrics_file, {'target': ','.join(report['targets'])})
+    finally:
+        close_db_connections()
+        if executor:
+            executor.shutdown()
+        if parse_executor:
+            parse_executor.shutdown()
 
 if __name__ == "__main__":
-    for desc_file in glob.glob(args.json_file_path):
-        process_descriptor_file(desc_file)
+    main()
@@ -0,0 +1,24 @@
+"""
+Load delimited and xlsx files into Oracle and export query results to xlsx workbooks, driven by json descriptor files.
+
+The engine lives in `ImportData`, which only loads cx_Oracle, openpyxl and xlsxwriter once a run needs them:
+
+    from import_oracle import ImportData
+    ImportData.configure(workers=4, adaptive_batches=True)
+    report = ImportData.run('descriptors/*.json')
+    ImportData.close_db_connections()
+"""
+from import_oracle.ImportData import (
+    build_run_report,
+    close_db_connections,
+    configure,
+    load_descriptor_file,
+    load_descriptor_files,
+    parse_args,
+    process_descriptor_file,
+    process_export,
+    process_import,
+    run,
+    write_metrics_file,
+    write_run_report
+)
@@ -1,26 +1,74 @@
-import cx_Oracle
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
 import argparse
+import hashlib
+import itertools
+import json
+import queue
+import threading
+import time
+
+from ImportData import LazyModule, write_metrics_file
+
+# Imported on first use, so --help and argument errors do not load the database driver.
+cx_Oracle = LazyModule('cx_Oracle')
 
 DB_USER = os.environ.get('DB_USER', "")
 DB_PASSWORD = os.environ.get('DB_PASSWORD', "")
 DB_HOST = os.environ.get('DB_HOST', "")
 
-MAX_BYTES_PER_CHUNK=16000
-
 parser = argparse.ArgumentParser(description='Import CSV data into Oracle')
 parser.add_argument('--header', dest='header', action='store_const', const=True, default=False, help='Use if first row of input file is a header row and should not be imported.')
 parser.add_argument('--delimiter', default='~', help='Delimiter to use when parsing input file. Defaults to ~. use "tab" keyword to specify input is delimeted by tabs')
 parser.add_argument('--empty-target', dest='empty_target', action='store_const', const=True, default=False, help='Use this flag to clear out target database schema before importing data.')
+parser.add_argument('--reload', choices=['truncate', 'staging'], help='Full reload of the target with direct-path APPEND_VALUES inserts. truncate empties the target first, staging loads <target>_STG and only replaces the target rows once the whole file loaded. Direct-path inserts cannot reject rows individually, a bad row fails its whole chunk.')
+parser.add_argument('--rebuild-indexes', dest='rebuild_indexes', action='store_const', const=True, default=False, help='With --reload, mark the non-unique indexes of the loaded table unusable during the load and rebuild them afterwards.')
+parser.add_argument('--inserters', type=int, default=0, help='Number of threads inserting chunks from a session pool while the input file is read. Defaults to 0, inserting on the reading thread.')
+parser.add_argument('--max-bytes-per-chunk', dest='max_bytes_per_chunk', type=int, default=16000, help='Bytes of the input file read into each bulk insert. Defaults to 16000.')
+parser.add_argument('--adaptive-batches', dest='adaptive_batches', action='store_const', const=True, default=False, help='Size bulk inserts by row count, growing or shrinking them from the measured insert and commit latency.')
+parser.add_argument('--initial-rows', dest='initial_rows', type=int, default=1000, help='First bulk insert size in rows with --adaptive-batches. Defaults to 1000.')
+parser.add_argument('--max-rows', dest='max_rows', type=int, default=50000, help='Largest bulk insert in rows with --adaptive-batches. Defaults to 50000.')
+parser.add_argument('--max-batch-bytes', dest='max_batch_bytes', type=int, default=32*1024*1024, help='Largest bulk insert in bytes of input with --adaptive-batches. Defaults to 32MB.')
+parser.add_argument('--target-seconds', dest='target_seconds', type=float, default=1.0, help='Insert and commit latency aimed for with --adaptive-batches. Defaults to 1 second.')
+parser.add_argument('--commit-rows', dest='commit_rows', type=int, default=0, help='Commit once at least this many rows were inserted by a session. Defaults to 0, committing every bulk insert.')
+parser.add_argument('--checkpoint-dir', dest='checkpoint_dir', help='Directory of the input file checkpoints. Every committed chunk is recorded there, a rerun resumes the file where it stopped and skips a file that was fully loaded.')
+parser.add_argument('--report-file', dest='report_file', help='Path of the JSON run report with the rows, bytes and time of every stage. Defaults to <target>_<date>_report.json.')
+parser.add_argument('--metrics-file', dest='metrics_file', help='Path of a Prometheus textfile collector file updated with the stage totals at the end of the run.')
+parser.add_argument('--show-rows', dest='show_rows', type=int, default=0, help='Print up to this many of the loaded rows after the load is verified. Defaults to 0.')
 parser.add_argument('country', help='Country to be added to country column: SCL, ALA etc')
 parser.add_argument('target', help='Target database table to import data into')
 parser.add_argument('inputfile', help='Input file for parsing')
-args = parser.parse_args()
+reject_lock = threading.Lock()
+stage_lock = threading.Lock()
+checkpoint_lock = threading.Lock()
+# Database session of the run, opened by `main`.
+dsn = None
+connection = None
 
-load_date_now = datetime.now()
-load_date = datetime.now().strftime('%Y/%m/%d %H:%M:%S')
-LOG_FILE = '%s_%s_error_log.txt' % (args.target, load_date_now.strftime('%Y%m%d-%H:%M:%S'))
+def configure(argv=None):
+    # Parses the command line arguments `argv`, sys.argv by default, and starts a new run with them.
+    global args, load_date_now, load_date, LOG_FILE, REJECT_FILE, REPORT_FILE, reject_count, stage_stats
+    global load_target, unusable_indexes, batch_state, checkpoint
+    args = parser.parse_args(argv)
+    if args.reload and args.empty_target:
+        parser.error('--reload already empties the target, it cannot be combined with --empty-target')
+    if args.checkpoint_dir and (args.reload or args.empty_target):
+        parser.error('--reload and --empty-target empty the target, they cannot resume a load from --checkpoint-dir')
+
+    load_date_now = datetime.now()
+    load_date = load_date_now.strftime('%Y/%m/%d %H:%M:%S')
+    LOG_FILE = '%s_%s_error_log.txt' % (args.target, load_date_now.strftime('%Y%m%d-%H:%M:%S'))
+    REJECT_FILE = '%s_%s_rejects.txt' % (args.target, load_date_now.strftime('%Y%m%d-%H:%M:%S'))
+    REPORT_FILE = args.report_file or '%s_%s_report.json' % (args.target, load_date_now.strftime('%Y%m%d-%H:%M:%S'))
+    reject_count = [0]
+    stage_stats = {}
+    # Table the rows are inserted into, the staging table with --reload staging.
+    load_target = args.target
+    unusable_indexes = []
+    batch_state = {'rows': min(args.initial_rows, args.max_rows), 'line_bytes': None, 'best_rows': None, 'best_throughput': 0.0, 'lock': threading.Lock()}
+    # Checkpoint of the input file with --checkpoint-dir, read by `import_data`.
+    checkpoint = None
+    return args
 
 def log(msg, level='INFO'):
     print('[%s] - %s' % (level, msg))
@@ -28,7 +76,78 @@ def log(msg, level='INFO'):
         with open(LOG_FILE, 'a+') as fp:
             fp.write('[ERROR] - %s' % msg)
 
-def execute_sql(query, commit=True):
+def record_stage(stage, seconds, rows=0, nbytes=0):
+    # Adds one run of `stage` to the run totals, from the reading thread or the inserter threads.
+    with stage_lock:
+        stats = stage_stats.setdefault(stage, {'seconds': 0.0, 'calls': 0, 'rows': 0, 'bytes': 0})
+        stats['seconds'] += seconds
+        stats['calls'] += 1
+        stats['rows'] += rows
+        stats['bytes'] += nbytes
+
+def write_report(rows_failed, rows_rejected=0):
+    report = {
+        'started': load_date_now.isoformat(),
+        'finished': datetime.now().isoformat(),
+        'seconds': (datetime.now() - load_date_now).total_seconds(),
+        'target': args.target,
+        'inputfile': args.inputfile,
+        'bytes': os.path.getsize(args.inputfile),
+        'rows_read': stage_stats.get('parse', {}).get('rows', 0),
+        'rows_failed': rows_failed,
+        'rows_rejected': rows_rejected,
+        'batch_rows': batch_state['rows'] if args.adaptive_batches else None,
+        'stages': stage_stats
+    }
+    log('Stages: %s' % ', '.join(['%s %.3fs (%d rows)' % (stage, x['seconds'], x['rows']) for stage, x in stage_stats.items()]))
+    with open(REPORT_FILE, 'w') as fp:
+        json.dump(report, fp, indent=2)
+    if args.metrics_file:
+        write_metrics_file(report, args.metrics_file, {'target': args.target})
+
+def checkpoint_path():
+    abs_path = os.path.abspath(args.inputfile)
+    return os.path.join(args.checkpoint_dir, '%s-%s-%s.json' % (args.target, os.path.basename(abs_path), hashlib.sha1(abs_path.encode()).hexdigest()[:10]))
+
+def load_checkpoint():
+    # `row` is the last row committed with all the rows before it, `offset` the file position right after row
+    # `offset_row` and `committed` the row ranges committed past `row`. A checkpoint of a file whose size or
+    # modification time changed since is discarded.
+    stat = os.stat(args.inputfile)
+    path = checkpoint_path()
+    if os.path.exists(path):
+        with open(path, 'r') as fp:
+            saved = json.load(fp)
+        if saved['size'] == stat.st_size and saved['mtime'] == stat.st_mtime:
+            saved['pending'] = dict([(start, (end, None)) for start, end in saved['committed']])
+            return saved
+        log('%s changed since checkpoint %s, loading it from the start' % (args.inputfile, path))
+    return {'size': stat.st_size, 'mtime': stat.st_mtime, 'row': 0, 'offset': None, 'offset_row': 0, 'committed': [],
+            'complete': False, 'pending': {}}
+
+def save_checkpoint():
+    path = checkpoint_path()
+    with open(path + '.tmp', 'w') as fp:
+        json.dump(dict([(key, value) for key, value in checkpoint.items() if key != 'pending']), fp)
+    os.replace(path + '.tmp', path)
+
+def record_checkpoint(ranges):
+    # Chunks commit out of order with --inserters, `row` only advances once every row before a chunk is committed.
+    if not checkpoint:
+        return
+    with checkpoint_lock:
+        pending = checkpoint['pending']
+        for row_start, row_end, offset in ranges:
+            pending[row_start] = (row_end, offset)
+        while checkpoint['row'] + 1 in pending:
+            row_end, offset = pending.pop(checkpoint['row'] + 1)
+            checkpoint['row'] = row_end
+            if offset is not None:
+                checkpoint['offset'], checkpoint['offset_row'] = offset, row_end
+        checkpoint['committed'] = sorted([[start, end] for start, (end, _) in pending.items()])
+        save_checkpoint()
+
+def execute_sql(query, commit=True, raise_errors=False):
     log('SQL query="%s"' % query, level='DEBUG')
     try:
         curs = connection.cursor()
@@ -36,41 +155,315 @@ def execute_sql(query, commit=True):
         connection.commit()
     except Exception as e:
         log(str(e), level='ERROR')
+        if raise_errors:
+            raise e
 
-def executemany_sql(rows, commit=True):
-    sql_query = """insert into %s values (%s)""" % (args.target,','.join([':%d' % d for d in range(1,len(rows[0])+1)]))
+def write_rejects(rows, row_start, batch_errors):
+    # Rejected rows are written with their input file line number, followed by the delimited row.
+    delimiter = args.delimiter if args.delimiter != 'tab' else '\t'
+    line_offset = 1 if args.header else 0
+    with reject_lock:
+        reject_count[0] += len(batch_errors)
+        with open(REJECT_FILE, 'a+') as fp:
+            for error in batch_errors:
+                line = row_start + error.offset + line_offset
+                log('Line %d rejected - %s' % (line, error.message), level='ERROR')
+                fp.write('%d%s%s%s%s\n' % (line, delimiter, error.message, delimiter, delimiter.join([str(x) for x in rows[error.offset]])))
+
+def executemany_sql(rows, commit=True, conn=None, row_start=1):
+    conn = conn or connection
+    sql_query = """insert %sinto %s values (%s)""" % ('/*+ APPEND_VALUES */ ' if args.reload else '', load_target, ','.join([':%d' % d for d in range(1,len(rows[0])+1)]))
     log('Bulk SQL query="%s"' % sql_query, level='DEBUG')
     try:
-        curs = connection.cursor()
-        curs.executemany(sql_query, rows)
-        connection.commit()
-    except cx_Oracle.DatabaseError as e:
-        errorObj, = e.args
-        log("Row %d has error %s" % (curs.rowcount, errorObj.message), level='ERROR')
+        curs = conn.cursor()
+        # Good rows of the chunk are loaded, rows the database rejects are returned as batch errors.
+        curs.executemany(sql_query, rows, batcherrors=not args.reload)
+        batch_errors = curs.getbatcherrors() if not args.reload else []
+        if commit:
+            conn.commit()
+        if batch_errors:
+            write_rejects(rows, row_start, batch_errors)
+        return True
+    except Exception as e:
+        # A bind error fails the chunk like a database error.
+        log('Rows %d-%d have error %s' % (row_start, row_start + len(rows) - 1, e), level='ERROR')
+        return False
+
+def commit_rows(conn, uncommitted):
+    # Commits the bulk inserts of a session since its last commit and records them in the checkpoint,
+    # returns the row ranges that failed to commit.
+    if not uncommitted:
+        return []
+    ranges = list(uncommitted)
+    del uncommitted[:]
+    started = time.time()
+    try:
+        conn.commit()
+    except Exception as e:
+        log('Commit of rows %d-%d failed - %s' % (ranges[0][0], ranges[-1][1], e), level='ERROR')
+        return [(start, end) for start, end, _ in ranges]
+    record_stage('commit', time.time() - started, sum([end - start + 1 for start, end, _ in ranges]))
+    record_checkpoint(ranges)
+    return []
+
+def insert_rows(conn, row_start, row_end, rows, uncommitted, offset=None):
+    # Inserts one chunk, committing once `--commit-rows` rows are pending on the session. `offset` is the
+    # input file position after the chunk, recorded in the checkpoint once it is committed.
+    # Returns the row ranges that were not loaded.
+    started = time.time()
+    loaded = executemany_sql(rows, commit=False, conn=conn, row_start=row_start)
+    record_stage('execute', time.time() - started, len(rows))
+    log('Rows %d-%d executed in %.3fs' % (row_start, row_end, time.time() - started), level='DEBUG')
+    if not loaded:
+        return [(row_start, row_end)]
+    uncommitted.append((row_start, row_end, offset))
+    failed = []
+    if args.reload or sum([end - start + 1 for start, end, _ in uncommitted]) >= args.commit_rows:
+        failed = commit_rows(conn, uncommitted)
+    if args.adaptive_batches:
+        record_batch_timing(len(rows), time.time() - started)
+    return failed
+
+def record_batch_timing(row_count, seconds):
+    # Moves the batch size towards the rows loaded in --target-seconds at the measured throughput,
+    # at most doubling or halving it, and back to the best size seen when growing made throughput drop.
+    with batch_state['lock']:
+        size = batch_state['rows']
+        if row_count < size:
+            return
+        throughput = row_count / max(seconds, 0.001)
+        if seconds > args.target_seconds * 1.5:
+            new_size = size // 2
+        else:
+            new_size = min(max(int(throughput * args.target_seconds), size // 2), size * 2)
+            if batch_state['best_rows'] and size > batch_state['best_rows'] and throughput < batch_state['best_throughput'] * 0.8:
+                new_size = batch_state['best_rows']
+        if throughput > batch_state['best_throughput']:
+            batch_state['best_rows'], batch_state['best_throughput'] = size, throughput
+        new_size = min(max(new_size, 1), args.max_rows)
+        if args.max_batch_bytes and batch_state['line_bytes']:
+            new_size = min(new_size, max(args.max_batch_bytes // batch_state['line_bytes'], 1))
+        if abs(new_size - size) > size // 10:
+            log('Batch size %d -> %d rows (%d rows inserted in %.3fs, %.0f rows/s)' % (size, new_size, row_count, seconds, throughput))
+            batch_state['rows'] = new_size
 
 def empty_target():
     sql_query = "delete from %s" % args.target
     execute_sql(sql_query)
 
-def import_data():
-    f = open(args.inputfile, 'r')
-    if args.header:
-        next(f)
+def set_indexes_unusable(table):
+    # Unique indexes stay usable, the database still has to enforce them.
+    curs = connection.cursor()
+    curs.execute("select index_name from user_indexes where table_name = :table_name and uniqueness = 'NONUNIQUE' "
+                 "and partitioned = 'NO' and index_type not in ('LOB', 'IOT - TOP') and status = 'VALID'", {'table_name': table.upper()})
+    for index_name, in curs.fetchall():
+        log('Marking index %s unusable' % index_name)
+        execute_sql('alter index %s unusable' % index_name, raise_errors=True)
+        unusable_indexes.append(index_name)
+
+def prepare_reload():
+    global load_target
+    if args.reload == 'staging':
+        load_target = '%s_STG' % args.target[:26]
+        log('Creating staging table %s' % load_target)
+        try:
+            connection.cursor().execute('drop table %s purge' % load_target)
+        except cx_Oracle.DatabaseError:
+            pass
+        execute_sql('create table %s nologging as select * from %s where 1 = 0' % (load_target, args.target), raise_errors=True)
+    else:
+        log('Truncating %s' % args.target)
+        execute_sql('truncate table %s' % args.target, raise_errors=True)
+        if args.rebuild_indexes:
+            set_indexes_unusable(args.target)
+
+def finish_reload(failed_chunks):
+    # With --reload staging the target keeps its grants, constraints and triggers, only its rows are replaced.
+    try:
+        if args.reload == 'staging':
+            if failed_chunks:
+                log('Rows failed to load, %s is left unchanged and the loaded rows are kept in %s' % (args.target, load_target), level='ERROR')
+                return
+            log('Replacing the rows of %s with %s' % (args.target, load_target))
+            execute_sql('truncate table %s' % args.target, raise_errors=True)
+            if args.rebuild_indexes:
+                set_indexes_unusable(args.target)
+            execute_sql('insert /*+ APPEND */ into %s select * from %s' % (args.target, load_target), raise_errors=True)
+            execute_sql('drop table %s purge' % load_target)
+    finally:
+        for index_name in unusable_indexes:
+            log('Rebuilding index %s' % index_name)
+            execute_sql('alter index %s rebuild' % index_name)
+
+def verify_load(rows_loaded):
+    # Counts the rows of this load on the server instead of fetching the target. Every row was inserted with
+    # the country and the load date as its last two columns, the load date is matched to the second as DATE
+    # columns drop the fractional seconds. Up to --show-rows of them are fetched for display.
+    started = time.time()
+    curs = connection.cursor()
+    curs.execute('select * from %s where 1 = 0' % args.target)
+    country_column, load_date_column = [c[0] for c in curs.description][-2:]
+    where = '%s = :country and %s >= :load_start and %s < :load_end' % (country_column, load_date_column, load_date_column)
+    load_start = load_date_now.replace(microsecond=0)
+    binds = {'country': args.country, 'load_start': load_start, 'load_end': load_start + timedelta(seconds=1)}
+    curs.execute('select count(*) from %s where %s' % (args.target, where), binds)
+    rows_found, = curs.fetchone()
+    if rows_found == rows_loaded:
+        log('Verified %d rows of %s for %s in %.3fs' % (rows_found, args.target, args.country, time.time() - started))
+    else:
+        log('%d rows were loaded into %s for %s but %d rows were found' % (rows_loaded, args.target, args.country, rows_found), level='ERROR')
+    if args.show_rows:
+        print("\nData loaded into %s" % args.target)
+        print("+-----------------")
+        curs.execute('select * from %s where %s and rownum <= :show_rows' % (args.target, where), dict(binds, show_rows=args.show_rows))
+        for row in curs.fetchmany(args.show_rows):
+            for elem in row:
+                print(str(elem).ljust(2), end='')
+            print()
+    return rows_found
+
+def read_chunks():
+    # Yields (first row, last row, rows, file position after the last row) chunks of the input file. The lines
+    # keep their line endings, so with --checkpoint-dir the position is the byte count read so far.
+    f = open(args.inputfile, 'r', newline='')
+    offset = 0
+    row_counter = 1
+    skip_row = None
+    if checkpoint and checkpoint['offset'] is not None:
+        f.seek(checkpoint['offset'])
+        offset = checkpoint['offset']
+        row_counter = checkpoint['offset_row'] + 1
+    elif args.header:
+        offset += len(next(f).encode(f.encoding))
+    if checkpoint and (checkpoint['row'] or checkpoint['committed']):
+        resume_row = checkpoint['row']
+        committed = list(checkpoint['committed'])
+        skip_row = lambda n: n <= resume_row or any([start <= n <= end for start, end in committed])
     delimiter = args.delimiter if args.delimiter != 'tab' else '\t'
 
-    # Bulk insert
     while True:
-        lines = f.readlines(MAX_BYTES_PER_CHUNK)
+        started = time.time()
+        if args.adaptive_batches:
+            lines = list(itertools.islice(f, batch_state['rows']))
+            if lines and not batch_state['line_bytes']:
+                batch_state['line_bytes'] = max(sum([len(line) for line in lines]) // len(lines), 1)
+        else:
+            lines = f.readlines(args.max_bytes_per_chunk)
         if not lines:
             break
-        log("Reading %d bytes from input file - %d rows" % (MAX_BYTES_PER_CHUNK, len(lines)), level='DEBUG')
-        bulk_row_insert=[]
-        for line in lines:
-            data = line.strip().split(delimiter)
-            bulk_row_insert.append(data + [args.country] + [load_date_now])
-        log('Bulk inserting %d rows' % len(bulk_row_insert), level='DEBUG')
-        executemany_sql(bulk_row_insert)
-    
+        record_stage('read', time.time() - started, len(lines), sum([len(line) for line in lines]))
+        if checkpoint:
+            offset += len(''.join(lines).encode(f.encoding))
+        log("Reading %d rows from input file" % len(lines), level='DEBUG')
+        started = time.time()
+        runs = [(row_counter, lines)]
+        if skip_row:
+            # Rows committed by an earlier run are left out, the rows in between are sent as chunks of their own.
+            runs = []
+            for loaded, group in itertools.groupby(enumerate(lines, row_counter), key=lambda x: skip_row(x[0])):
+                group = list(group)
+                if not loaded:
+                    runs.append((group[0][0], [line for _, line in group]))
+        chunks = []
+        for first_row, run_lines in runs:
+            bulk_row_insert = []
+            for line in run_lines:
+                data = line.strip().split(delimiter)
+                bulk_row_insert.append(data + [args.country] + [load_date_now])
+            last_row = first_row + len(bulk_row_insert) - 1
+            chunks.append((first_row, last_row, bulk_row_insert, offset if last_row == row_counter + len(lines) - 1 else None))
+        record_stage('parse', time.time() - started, sum([len(chunk[2]) for chunk in chunks]))
+        for chunk in chunks:
+            yield chunk
+        row_counter += len(lines)
+    f.close()
+
+def pipeline_insert(chunks):
+    # Inserter threads drain a bounded queue using sessions from a pool while the main thread keeps reading.
+    # An inserter keeps draining it after any error, the main thread would block on a full queue otherwise.
+    pool = cx_Oracle.SessionPool(user=DB_USER, password=DB_PASSWORD, dsn=dsn, min=args.inserters, max=args.inserters,
+                                 increment=0, threaded=True, encoding="UTF-8")
+    chunk_queue = queue.Queue(maxsize=args.inserters * 2)
+    failed_chunks = []
+
+    def inserter():
+        uncommitted = []
+        try:
+            session = pool.acquire()
+        except Exception as e:
+            log(str(e), level='ERROR')
+            session = None
+        while True:
+            chunk = chunk_queue.get()
+            if chunk is None:
+                break
+            row_start, row_end, rows, offset = chunk
+            log('Bulk inserting rows %d-%d' % (row_start, row_end), level='DEBUG')
+            if not session:
+                failed_chunks.append((row_start, row_end))
+                continue
+            try:
+                failed_chunks.extend(insert_rows(session, row_start, row_end, rows, uncommitted, offset))
+            except Exception as e:
+                log('Rows %d-%d were not inserted - %s' % (row_start, row_end, e), level='ERROR')
+                failed_chunks.append((row_start, row_end))
+        if session:
+            failed_chunks.extend(commit_rows(session, uncommitted))
+            pool.release(session)
+
+    threads = [threading.Thread(target=inserter) for i in range(args.inserters)]
+    for thread in threads:
+        thread.start()
+    try:
+        for chunk in chunks:
+            chunk_queue.put(chunk)
+    finally:
+        for thread in threads:
+            chunk_queue.put(None)
+        for thread in threads:
+            thread.join()
+    for row_start, row_end in sorted(failed_chunks):
+        log('Rows %d-%d were not loaded' % (row_start, row_end), level='ERROR')
+    return failed_chunks
+
+def import_data():
+    # Bulk insert
+    global checkpoint
+    if args.checkpoint_dir:
+        os.makedirs(args.checkpoint_dir, exist_ok=True)
+        checkpoint = load_checkpoint()
+        if checkpoint['complete']:
+            log('%s was fully loaded into %s by a previous run, skipping it' % (args.inputfile, args.target))
+            return 0
+        if checkpoint['row'] or checkpoint['committed']:
+            log('Resuming %s after row %d' % (args.inputfile, checkpoint['row']))
+        # Fails on an unwritable --checkpoint-dir before a chunk commits rows no checkpoint records.
+        save_checkpoint()
+    if args.reload:
+        prepare_reload()
+    if args.inserters:
+        failed_chunks = pipeline_insert(read_chunks())
+    else:
+        uncommitted = []
+        failed_chunks = []
+        for row_start, row_end, rows, offset in read_chunks():
+            log('Bulk inserting %d rows' % len(rows), level='DEBUG')
+            failed_chunks.extend(insert_rows(connection, row_start, row_end, rows, uncommitted, offset))
+        failed_chunks.extend(commit_rows(connection, uncommitted))
+        for row_start, row_end in failed_chunks:
+            log('Rows %d-%d were not loaded' % (row_start, row_end), level='ERROR')
+    if args.adaptive_batches:
+        log('Batch size settled at %d rows, pin it with --initial-rows %d --max-rows %d' % (batch_state['rows'], batch_state['rows'], batch_state['rows']))
+    if args.reload:
+        finish_reload(failed_chunks)
+    if checkpoint and not failed_chunks:
+        checkpoint['complete'] = True
+        save_checkpoint()
+    rows_failed = sum([end - start + 1 for start, end in failed_chunks])
+    write_report(rows_failed, reject_count[0])
+    # Rows of the input file that are now in the target.
+    return stage_stats.get('parse', {}).get('rows', 0) - rows_failed - reject_count[0]
+
     # # Uncomment this block for sequential insert
     # for row in f.readlines():
     #     data = row.strip().split(delimiter)
@@ -78,7 +471,9 @@ def import_data():
     #     sql_query = "insert into %s values (%s, '%s', to_date('%s', 'yyyy/mm/dd hh24:mi:ss'))" % (args.target, ','.join("'{}'".format(x) for x in data), args.country, load_date)
     #     execute_sql(sql_query)
 
-if __name__ == "__main__":
+def main(argv=None):
+    global dsn, connection
+    configure(argv)
     try:
         dsn = cx_Oracle.makedsn(DB_HOST, 1521, sid="orcl")
         connection = cx_Oracle.connect(DB_USER, DB_PASSWORD, dsn, encoding="UTF-8")
@@ -89,14 +484,7 @@ if __name__ == "__main__":
     if args.empty_target:
         log('Empty target flag passed in. Deleting all rows from target DB %s' % args.target)
         empty_target()
-    import_data()
+    verify_load(import_data())
 
-    # This block below prints all rows from <target>. It's mostly for debugging and can be removed if not needed.
-    print("\nData in %s" % args.target)
-    print("+-----------------")
-    curs = connection.cursor()
-    curs.execute('SELECT * FROM %s' % args.target)
-    for row in curs.fetchall():
-        for elem in row:
-            print(str(elem).ljust(2), end='')
-        print()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
\ No newline at end of file
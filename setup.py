@@ -24,10 +24,10 @@ setuptools.setup(
         "aws-cdk.aws-rds",
         "cx_Oracle",
         "xlsxwriter",
-        "openpyxl"
+        "openpyxl>=3.1,<3.2"
     ],
 
-    python_requires=">=3.6",
+    python_requires=">=3.7",
 
     classifiers=[
         "Development Status :: 4 - Beta",
@@ -38,7 +38,6 @@ setuptools.setup(
 
         "Programming Language :: JavaScript",
         "Programming Language :: Python :: 3 :: Only",
-        "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: 3.8",
 